@@ -1,7 +1,56 @@
+import os
+import tempfile
+import weakref
 import streamlit as st
 import pandas as pd
-from db.database import get_all_bookings
+from db.database import get_all_bookings, get_upcoming_bookings, count_upcoming_bookings
+from db.bulk import export_bookings_to_file
 from datetime import datetime
+from utils import memory, tracing
+
+EXPORT_DIR = "data/exports"
+BOOKING_COLUMNS = ['id', 'name', 'email', 'phone', 'date', 'time', 'status', 'created_at']
+
+# Frames built by the current render; they should be gone after each rerun.
+_frames = weakref.WeakSet()
+
+
+def _track(df):
+    _frames.add(df)
+    return df
+
+
+memory.register("dashboard_frames", lambda: sum(int(f.memory_usage(deep=True).sum()) for f in list(_frames)))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ExportFile:
+    """A session's export on disk; the file is deleted when this object is dropped."""
+
+    def __init__(self, fmt):
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=EXPORT_DIR, prefix="bookings_", suffix=f".{fmt}", delete=False
+        ) as f:
+            self.path = f.name
+        self.file_name = f"bookings_export.{fmt}"
+        self._finalizer = weakref.finalize(self, _remove, self.path)
+
+    def delete(self):
+        self._finalizer()
+
+
+def discard_export():
+    """Delete the session's export once served (or replaced)."""
+    export = st.session_state.pop("export_file", None)
+    if export is not None:
+        export.delete()
 
 
 def admin_dashboard_page():
@@ -13,7 +62,11 @@ def admin_dashboard_page():
     </div>
     """, unsafe_allow_html=True)
     
-    bookings = get_all_bookings()
+    latency_panel()
+    memory_panel()
+
+    include_archive = st.checkbox("🗄️ Include archived bookings", key="include_archive")
+    bookings = get_all_bookings(include_archive=include_archive)
 
     if not bookings:
         st.markdown("""
@@ -26,7 +79,7 @@ def admin_dashboard_page():
         return
 
     # Convert to DataFrame with proper column names
-    df = pd.DataFrame(bookings, columns=['id', 'name', 'email', 'phone', 'date', 'time', 'status', 'created_at'])
+    df = _track(pd.DataFrame(bookings, columns=BOOKING_COLUMNS))
     
     # ========== QUICK STATS SECTION ==========
     st.markdown("<h3 style='color: #e0e7ff; margin: 2rem 0 1rem 0;'>📈 Quick Stats</h3>", unsafe_allow_html=True)
@@ -37,11 +90,7 @@ def admin_dashboard_page():
         st.metric("📅 Total Bookings", len(df))
     
     with metric_col2:
-        try:
-            upcoming = len(df[pd.to_datetime(df['date']) >= datetime.now().date()])
-            st.metric("⏳ Upcoming", upcoming)
-        except:
-            st.metric("⏳ Upcoming", len(df))
+        st.metric("⏳ Upcoming", count_upcoming_bookings())
     
     with metric_col3:
         st.metric("👥 Patients", df['name'].nunique())
@@ -50,6 +99,18 @@ def admin_dashboard_page():
         st.metric("✉️ Contacts", df['email'].nunique())
     
     st.markdown("---")
+
+    # ========== NEXT APPOINTMENTS SECTION ==========
+    st.markdown("<h3 style='color: #e0e7ff;'>📆 Next Appointments</h3>", unsafe_allow_html=True)
+
+    upcoming_rows = get_upcoming_bookings(limit=10)
+    if upcoming_rows:
+        upcoming_df = _track(pd.DataFrame(upcoming_rows, columns=BOOKING_COLUMNS))
+        st.dataframe(upcoming_df.drop(columns=['created_at']), width='stretch', hide_index=True)
+    else:
+        st.info("💡 No upcoming appointments")
+
+    st.markdown("---")
     
     # ========== SEARCH SECTION ==========
     st.markdown("<h3 style='color: #e0e7ff;'>🔍 Search Bookings</h3>", unsafe_allow_html=True)
@@ -62,7 +123,7 @@ def admin_dashboard_page():
     with search_col2:
         search_email = st.text_input("✉️ Search by email:", key="search_email", placeholder="Enter email...")
     
-    filtered_df = df.copy()
+    filtered_df = _track(df.copy())
     
     if search_name:
         filtered_df = filtered_df[filtered_df['name'].str.contains(search_name, case=False, na=False)]
@@ -74,7 +135,7 @@ def admin_dashboard_page():
         st.markdown(f"<p style='color: #38ef7d; font-weight: 600;'>✅ Found {len(filtered_df)} booking(s)</p>", unsafe_allow_html=True)
         
         # Format dates for display
-        display_df = filtered_df.copy()
+        display_df = _track(filtered_df.copy())
         display_df['date'] = pd.to_datetime(display_df['date']).dt.strftime('%Y-%m-%d')
         display_df['created_at'] = pd.to_datetime(display_df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
         
@@ -85,8 +146,107 @@ def admin_dashboard_page():
         else:
             st.info("💡 Enter a name or email to search")
     
+    st.markdown("---")
+
+    # ========== EXPORT SECTION ==========
+    st.markdown("<h3 style='color: #e0e7ff;'>📤 Export Bookings</h3>", unsafe_allow_html=True)
+
+    export_col1, export_col2 = st.columns(2)
+
+    with export_col1:
+        export_format = st.selectbox("Format", ["csv", "jsonl"], key="export_format")
+
+    with export_col2:
+        if st.button("📦 Prepare export", width='stretch'):
+            discard_export()
+            # One temp file per session: concurrent admins never share an export,
+            # and the file (patient data) is removed when served or the session ends.
+            export = ExportFile(export_format)
+            count = export_bookings_to_file(export.path, export_format, include_archive=include_archive)
+            st.session_state.export_file = export
+            st.success(f"✅ Exported {count} booking(s)")
+
+    export = st.session_state.get("export_file")
+    if export is not None:
+        with open(export.path, "rb") as f:
+            st.download_button(
+                "⬇️ Download export",
+                data=f.read(),
+                file_name=export.file_name,
+                on_click=discard_export,
+                width='stretch'
+            )
+
     st.markdown("---")
     st.markdown(
         f"<p style='text-align: center; color: #8892b0; font-size: 0.85rem;'>Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>",
         unsafe_allow_html=True
     )
+
+
+def latency_panel():
+    """Per-stage p50/p95/p99 and the slowest recent chat turns"""
+
+    with st.expander("⏱️ Hot-Path Latency", expanded=False):
+        if not tracing.TRACE_ENABLED:
+            st.info("💡 Tracing is disabled. Set TRACE_ENABLED=1 to collect per-stage timings.")
+            return
+
+        stats = tracing.stage_stats()
+        if not stats:
+            st.info("💡 No spans recorded yet")
+            return
+
+        st.markdown("<h4 style='color: #e0e7ff;'>Per-stage latency (ms)</h4>", unsafe_allow_html=True)
+        st.dataframe(pd.DataFrame(stats), width='stretch', hide_index=True)
+
+        turns = tracing.slowest_turns(limit=10)
+        if turns:
+            st.markdown("<h4 style='color: #e0e7ff;'>Slowest recent turns</h4>", unsafe_allow_html=True)
+            turns_df = pd.DataFrame([
+                {
+                    "at": datetime.fromtimestamp(t["at"]).strftime('%Y-%m-%d %H:%M:%S'),
+                    "message": t["label"],
+                    "total_ms": t["total_ms"],
+                    "breakdown": ", ".join(f"{k}: {v} ms" for k, v in sorted(t["stages"].items(), key=lambda kv: -kv[1])),
+                }
+                for t in turns
+            ])
+            st.dataframe(turns_df, width='stretch', hide_index=True)
+
+        if st.button("💾 Flush spans to file"):
+            tracing.flush()
+            st.success(f"✅ Spans written to {tracing.TRACE_EXPORT_PATH}")
+
+
+def memory_panel():
+    """Per-component memory against budgets, plus tracemalloc allocation sites"""
+
+    with st.expander("🧠 Memory", expanded=False):
+        st.metric("Process RSS", f"{memory.process_rss_bytes() / 2**20:.0f} MB")
+
+        rows = memory.report()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), width='stretch', hide_index=True)
+
+        if st.button("🧹 Shed over-budget components"):
+            shed = memory.check_budgets(force=True)
+            if shed:
+                st.success(f"✅ Shed: {', '.join(shed)}")
+            else:
+                st.info("💡 Nothing over budget")
+
+        if not memory.MEMORY_TRACEMALLOC:
+            st.info("💡 Set MEMORY_TRACEMALLOC=1 to see allocations by file.")
+            return
+
+        st.markdown("<h4 style='color: #e0e7ff;'>Top allocations</h4>", unsafe_allow_html=True)
+        st.dataframe(pd.DataFrame(memory.top_allocations()), width='stretch', hide_index=True)
+
+        if st.button("📌 Take baseline"):
+            memory.take_baseline()
+
+        growth = memory.growth_since_baseline()
+        if growth:
+            st.markdown("<h4 style='color: #e0e7ff;'>Growth since baseline</h4>", unsafe_allow_html=True)
+            st.dataframe(pd.DataFrame(growth), width='stretch', hide_index=True)
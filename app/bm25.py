@@ -0,0 +1,128 @@
+"""Compact inverted-index BM25 retriever over the knowledge-base chunks.
+
+Postings are stored in flat ``array`` buffers (one slice per term, located
+through ``offsets``) instead of per-term Python lists, so the pickled index
+stays small and loads quickly. Document ids are positions in the chunk list,
+which match the FAISS index positions built from the same chunks.
+"""
+
+import math
+import re
+from array import array
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be before by can do does for from has have how i if in
+is it my of on or should the this to was what when where which who will
+with you your
+""".split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.idf = array("f")
+        self.offsets = array("I", [0])
+        self.postings_docs = array("I")
+        self.postings_tfs = array("H")
+        self.doc_lens = array("I")
+        self.avgdl = 0.0
+
+    @classmethod
+    def build(cls, texts, k1=1.5, b=0.75):
+        index = cls(k1, b)
+        postings = {}
+
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            index.doc_lens.append(len(tokens))
+
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((doc_id, min(tf, 65535)))
+
+        n_docs = len(index.doc_lens)
+        index.avgdl = (sum(index.doc_lens) / n_docs) if n_docs else 0.0
+
+        for term_id, (token, plist) in enumerate(sorted(postings.items())):
+            index.vocab[token] = term_id
+            df = len(plist)
+            index.idf.append(math.log(1 + (n_docs - df + 0.5) / (df + 0.5)))
+            index.postings_docs.extend(doc for doc, _ in plist)
+            index.postings_tfs.extend(tf for _, tf in plist)
+            index.offsets.append(len(index.postings_docs))
+
+        return index
+
+    def __len__(self):
+        return len(self.doc_lens)
+
+    def reference_score(self, query_tokens):
+        """Score of a document containing every query token once at average length.
+
+        That is simply the summed IDF; tokens missing from the vocabulary
+        count with the highest possible IDF so unknown words lower confidence.
+        """
+        n_docs = len(self.doc_lens)
+        unseen_idf = math.log(1 + (n_docs + 0.5) / 0.5)
+        return sum(
+            self.idf[self.vocab[t]] if t in self.vocab else unseen_idf
+            for t in query_tokens
+        )
+
+    def search(self, query, k=3):
+        """Return ``(doc_id, score, normalized_score, coverage)`` for the top ``k`` documents.
+
+        ``normalized_score`` is the score with each term's contribution capped
+        at its IDF, divided by ``reference_score`` of the query, so it never
+        exceeds 1.0 and can be compared against a fixed threshold.
+        ``coverage`` is the share of distinct query tokens the document
+        contains (unknown tokens count as missing).
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        term_ids = [self.vocab[t] for t in query_tokens if t in self.vocab]
+        if not term_ids:
+            return []
+
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        doc_lens = self.doc_lens
+        scores = {}
+        capped = {}
+        matched = {}
+
+        for term_id in term_ids:
+            idf = self.idf[term_id]
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            for doc_id, tf in zip(self.postings_docs[start:end], self.postings_tfs[start:end]):
+                norm = k1 * (1 - b + b * doc_lens[doc_id] / avgdl)
+                contribution = idf * tf * (k1 + 1) / (tf + norm)
+                scores[doc_id] = scores.get(doc_id, 0.0) + contribution
+                # A repeated term can score up to (k1 + 1) x IDF; cap it so one
+                # term cannot stand in for the others in the normalized score.
+                capped[doc_id] = capped.get(doc_id, 0.0) + min(contribution, idf)
+                matched[doc_id] = matched.get(doc_id, 0) + 1
+
+        reference = self.reference_score(query_tokens) or 1.0
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            (doc_id, score, capped[doc_id] / reference, matched[doc_id] / len(query_tokens))
+            for doc_id, score in top
+        ]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of keys; returns keys ordered by summed ``1 / (k + rank)``."""
+    fused = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
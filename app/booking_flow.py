@@ -1,6 +1,13 @@
-import re
-from datetime import datetime, date
+from datetime import datetime
 from app.rag_pipeline import rag_tool
+from utils.validation import (
+    is_valid_email,
+    is_valid_phone,
+    is_valid_future_date,
+    is_valid_time,
+    normalize_time,
+    to_start_at,
+)
 
 def reset_booking():
     return {
@@ -8,34 +15,11 @@ def reset_booking():
         "email": None,
         "phone": None,
         "date": None,
-        "time": None
+        "time": None,
+        "start_at": None
     }
 
 
-# ---------- VALIDATIONS ----------
-
-def is_valid_email(email: str) -> bool:
-    pattern = r"^[\w\.-]+@[\w\.-]+\.\w+$"
-    return re.match(pattern, email) is not None
-
-
-def is_valid_phone(phone: str) -> bool:
-    return phone.isdigit() and len(phone) == 10
-
-
-def is_valid_future_date(date_text: str) -> bool:
-    try:
-        entered_date = datetime.strptime(date_text, "%Y-%m-%d").date()
-        return entered_date >= date.today()
-    except ValueError:
-        return False
-
-
-def is_valid_time(time_text: str) -> bool:
-    pattern = r"^(0?[1-9]|1[0-2]):[0-5][0-9]\s?(AM|PM|am|pm)$"
-    return re.match(pattern, time_text) is not None
-
-
 # ---------- BOOKING FLOW ----------
 
 def handle_booking_flow(user_input, booking_data):
@@ -86,7 +70,7 @@ def handle_booking_flow(user_input, booking_data):
 
         # Validate time is within clinic hours (9 AM to 5 PM)
         try:
-            time_obj = datetime.strptime(user_input.strip(), "%I:%M %p").time()
+            time_obj = datetime.strptime(normalize_time(user_input), "%I:%M %p").time()
             clinic_start = datetime.strptime("09:00 AM", "%I:%M %p").time()
             clinic_end = datetime.strptime("05:00 PM", "%I:%M %p").time()
             
@@ -101,7 +85,8 @@ def handle_booking_flow(user_input, booking_data):
                 "Please enter time as **HH:MM AM/PM** (example: 10:30 AM)."
             )
 
-        booking_data["time"] = user_input.upper()
+        booking_data["time"] = normalize_time(user_input)
+        booking_data["start_at"] = to_start_at(booking_data["date"], booking_data["time"])
 
         return (
             "✅ **Please confirm your appointment details:**\n\n"
@@ -0,0 +1,148 @@
+"""Per-session chat transcript with a bounded in-memory tail.
+
+Streamlit reruns the whole script on every interaction, so the chat page
+renders only the last ``CHAT_RENDER_WINDOW`` messages and pages further back
+on request. The transcript keeps the newest ``CHAT_MEMORY_MESSAGES`` messages
+in memory; older ones are appended to a JSONL spill file and read back only
+when the user pages that far. Past ``CHAT_HISTORY_MAX_MESSAGES`` the oldest
+messages are dropped for good.
+"""
+
+import json
+import os
+import sys
+import threading
+import uuid
+import weakref
+from array import array
+from collections import deque
+from itertools import islice
+
+from app.config import CHAT_MEMORY_MESSAGES, CHAT_HISTORY_MAX_MESSAGES, CHAT_RENDER_WINDOW
+from utils import memory
+
+SPILL_DIR = "data/transcripts"
+
+_live = weakref.WeakSet()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ChatHistory:
+    def __init__(self, memory_messages=CHAT_MEMORY_MESSAGES,
+                 max_messages=CHAT_HISTORY_MAX_MESSAGES, spill_dir=SPILL_DIR):
+        self.memory_messages = memory_messages
+        self.max_messages = max(max_messages, memory_messages)
+        self.spill_dir = spill_dir
+        self.spill_path = os.path.join(spill_dir, f"{uuid.uuid4().hex}.jsonl")
+        self._recent = deque()      # (role, content), newest last
+        self._offsets = array("q")  # byte offset of each spilled message
+        self._dropped = 0           # leading spilled messages past the cap
+        # Memory shedding spills from whichever session thread runs the check.
+        self._lock = threading.RLock()
+        # Expired or cleared sessions take their spill file with them.
+        self._finalizer = weakref.finalize(self, _remove, self.spill_path)
+        _live.add(self)
+
+    def __len__(self):
+        with self._lock:
+            return self._spilled + len(self._recent)
+
+    @property
+    def _spilled(self):
+        return len(self._offsets) - self._dropped
+
+    def append(self, role, content):
+        with self._lock:
+            self._recent.append((role, content))
+            self.spill(self.memory_messages)
+            if len(self) > self.max_messages:
+                self._dropped += len(self) - self.max_messages
+                if self._dropped > len(self._offsets) // 2:
+                    self._compact()
+
+    def spill(self, keep):
+        """Move all but the newest ``keep`` in-memory messages to the spill file."""
+        with self._lock:
+            if len(self._recent) <= keep:
+                return
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self.spill_path, "ab") as f:
+                while len(self._recent) > keep:
+                    self._offsets.append(f.tell())
+                    f.write(json.dumps(self._recent.popleft()).encode("utf-8") + b"\n")
+
+    def memory_bytes(self):
+        with self._lock:
+            return memory.deep_sizeof(self._recent) + sys.getsizeof(self._offsets)
+
+    def _compact(self):
+        """Rewrite the spill file without the dropped messages."""
+        with self._lock:
+            if self._spilled:
+                start = self._offsets[self._dropped]
+                tmp_path = self.spill_path + ".tmp"
+                with open(self.spill_path, "rb") as src, open(tmp_path, "wb") as dst:
+                    src.seek(start)
+                    while chunk := src.read(1 << 20):
+                        dst.write(chunk)
+                os.replace(tmp_path, self.spill_path)
+                self._offsets = array("q", (o - start for o in self._offsets[self._dropped:]))
+            else:
+                _remove(self.spill_path)
+                self._offsets = array("q")
+            self._dropped = 0
+
+    def _read_spilled(self, start, stop):
+        if start >= stop:
+            return []
+        with open(self.spill_path, "rb") as f:
+            f.seek(self._offsets[self._dropped + start])
+            return [tuple(json.loads(f.readline())) for _ in range(stop - start)]
+
+    def messages(self, start=0, stop=None):
+        """Messages ``start:stop`` (oldest first) as ``{"role", "content"}`` dicts."""
+        with self._lock:
+            stop = len(self) if stop is None else min(stop, len(self))
+            start = max(start, 0)
+            spilled = self._spilled
+
+            rows = self._read_spilled(min(start, spilled), min(stop, spilled))
+            rows.extend(islice(self._recent, max(start - spilled, 0), max(stop - spilled, 0)))
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def recent(self, n):
+        with self._lock:
+            return self.messages(len(self) - n)
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._offsets = array("q")
+            self._dropped = 0
+            _remove(self.spill_path)
+
+
+# ---------- MEMORY ACCOUNTING ----------
+
+def sessions_memory_bytes():
+    return sum(history.memory_bytes() for history in list(_live))
+
+
+def shed_sessions(target_bytes):
+    """Spill the largest sessions down to one render window until under ``target_bytes``."""
+    sizes = sorted(((h.memory_bytes(), h) for h in list(_live)), key=lambda x: x[0], reverse=True)
+    total = sum(size for size, _ in sizes)
+    for size, history in sizes:
+        if total <= target_bytes:
+            break
+        history.spill(CHAT_RENDER_WINDOW)
+        total += history.memory_bytes() - size
+
+
+memory.register("sessions", sessions_memory_bytes, shed=shed_sessions)
@@ -1,3 +1,4 @@
+from app.config import DEFAULT_NAMESPACE
 from app.rag_pipeline import rag_tool
 
 QUESTION_KEYWORDS = [
@@ -12,12 +13,12 @@ def is_question(text):
     return any(word in text for word in QUESTION_KEYWORDS)
 
 
-def handle_user_message(user_input):
+def handle_user_message(user_input, namespace=DEFAULT_NAMESPACE):
     # Only attempt RAG for likely questions
     if not is_question(user_input):
         return None
 
-    rag_response = rag_tool(user_input)
+    rag_response = rag_tool(user_input, namespace=namespace)
 
     if rag_response:
         return (
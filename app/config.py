@@ -0,0 +1,68 @@
+"""Tunable settings for the chat app, overridable through environment variables."""
+
+import os
+
+# ---------- RETRIEVAL ----------
+
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+# Candidates taken from each retriever before reciprocal rank fusion.
+RAG_FUSION_CANDIDATES = int(os.getenv("RAG_FUSION_CANDIDATES", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Normalized BM25 score (1.0 = every query term matched at full weight) at
+# which a hit containing every query term is trusted on its own and the
+# query is never embedded. Exact matches in the longer rag_eval sample
+# chunks score about 0.89, hence the margin below 0.9.
+BM25_SKIP_DENSE_SCORE = float(os.getenv("BM25_SKIP_DENSE_SCORE", "0.85"))
+
+# ---------- VECTOR INDEX ----------
+
+# "auto", "flat", "hnsw", "ivf_sq" (8-bit scalar quantization) or "ivf_pq"
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto")
+# auto mode: exact search below the first size, HNSW below the second, IVF-SQ
+# above. IVF-PQ is the smallest but loses recall, so it is only used on request.
+FAISS_AUTO_HNSW_MIN = int(os.getenv("FAISS_AUTO_HNSW_MIN", "20000"))
+FAISS_AUTO_IVF_MIN = int(os.getenv("FAISS_AUTO_IVF_MIN", "200000"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "48"))
+FAISS_TRAIN_PER_LIST = int(os.getenv("FAISS_TRAIN_PER_LIST", "64"))
+# Search-time recall/latency knobs, applied whenever an index is loaded
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+# ---------- RETRIEVAL SIDECAR ----------
+
+# Unix socket of the shared embedding/retrieval server; empty = in-process only
+RAG_SIDECAR_SOCKET = os.getenv("RAG_SIDECAR_SOCKET", "")
+RAG_SIDECAR_POOL_SIZE = int(os.getenv("RAG_SIDECAR_POOL_SIZE", "4"))
+RAG_SIDECAR_TIMEOUT_S = float(os.getenv("RAG_SIDECAR_TIMEOUT_S", "5"))
+# After a failed call, use the in-process path for this long before retrying
+RAG_SIDECAR_RETRY_S = float(os.getenv("RAG_SIDECAR_RETRY_S", "10"))
+RAG_SERVER_MAX_BATCH = int(os.getenv("RAG_SERVER_MAX_BATCH", "32"))
+RAG_SERVER_BATCH_WAIT_MS = float(os.getenv("RAG_SERVER_BATCH_WAIT_MS", "2"))
+
+# ---------- KNOWLEDGE BASE NAMESPACES ----------
+
+# Clinic whose knowledge base is used when none is selected
+DEFAULT_NAMESPACE = os.getenv("CLINIC_ID", "default")
+# Budget for loaded clinic knowledge bases; least recently used are evicted
+KB_CACHE_MAX_MB = int(os.getenv("KB_CACHE_MAX_MB", "1024"))
+
+# ---------- INGESTION DEDUP ----------
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+# Estimated Jaccard similarity (word shingles) at which a chunk is a near duplicate
+DEDUP_NEAR_THRESHOLD = float(os.getenv("DEDUP_NEAR_THRESHOLD", "0.85"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+# A header/footer line is boilerplate when it recurs on this share of pages
+DEDUP_BOILERPLATE_MIN_FRACTION = float(os.getenv("DEDUP_BOILERPLATE_MIN_FRACTION", "0.5"))
+
+# ---------- CHAT HISTORY ----------
+
+# Messages rendered per rerun; "Load earlier" pages back by the same amount
+CHAT_RENDER_WINDOW = int(os.getenv("CHAT_RENDER_WINDOW", "20"))
+# Most recent messages sent to the LLM as conversation context
+CHAT_CONTEXT_MESSAGES = int(os.getenv("CHAT_CONTEXT_MESSAGES", "20"))
+# Messages kept in memory per session; older ones spill to disk
+CHAT_MEMORY_MESSAGES = int(os.getenv("CHAT_MEMORY_MESSAGES", "200"))
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "5000"))
@@ -0,0 +1,170 @@
+"""Ingestion-time cleanup: repeated page headers/footers and duplicate chunks.
+
+Clinic PDFs repeat the same header, footer and disclaimer on every page.
+Left in, they produce many near-identical chunks that cost embedding time
+and index memory and crowd the top-k results. This module:
+
+1. strips lines that recur at the top or bottom of many pages,
+2. drops chunks whose normalized text was already seen (exact hash),
+3. drops chunks whose MinHash-estimated Jaccard similarity to a kept chunk
+   is at least the threshold, using LSH banding to find candidates.
+"""
+
+import hashlib
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from app.config import (
+    DEDUP_NEAR_THRESHOLD,
+    DEDUP_BOILERPLATE_MIN_FRACTION,
+    DEDUP_SHINGLE_SIZE,
+)
+
+EDGE_LINES = 3
+MIN_BOILERPLATE_PAGES = 3
+NUM_PERM = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: candidate pairs from ~0.7 Jaccard up
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, np.int64((1 << 61) - 1), NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, np.int64((1 << 61) - 1), NUM_PERM, dtype=np.uint64)
+
+_WHITESPACE = re.compile(r"\s+")
+_PAGE_NUMBER = re.compile(r"\bpage\s*\d+(\s*(of|/)\s*\d+)?")
+_BARE_NUMBER = re.compile(r"^[\W\d]*\d[\W\d]*$")
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(text):
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def _line_key(line):
+    # Page numbers change per page ("Page 3 of 10", "- 3 -"); compare the rest.
+    return _PAGE_NUMBER.sub("page #", _BARE_NUMBER.sub("#", _normalize(line)))
+
+
+# ---------- HEADERS / FOOTERS ----------
+
+def strip_repeated_lines(pages, min_fraction=DEDUP_BOILERPLATE_MIN_FRACTION):
+    """Remove lines that recur in the first/last lines of at least ``min_fraction`` of pages.
+
+    Returns ``(cleaned_pages, removed_line_count)``.
+    """
+    if len(pages) < MIN_BOILERPLATE_PAGES:
+        return list(pages), 0
+
+    split_pages = [page.splitlines() for page in pages]
+    counts = Counter()
+    for lines in split_pages:
+        edges = lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+        counts.update({_line_key(line) for line in edges if line.strip()})
+
+    min_pages = max(MIN_BOILERPLATE_PAGES, int(min_fraction * len(pages)))
+    boilerplate = {key for key, n in counts.items() if n >= min_pages}
+    if not boilerplate:
+        return list(pages), 0
+
+    cleaned = []
+    removed = 0
+    for lines in split_pages:
+        kept = []
+        for i, line in enumerate(lines):
+            at_edge = i < EDGE_LINES or i >= len(lines) - EDGE_LINES
+            if at_edge and line.strip() and _line_key(line) in boilerplate:
+                removed += 1
+                continue
+            kept.append(line)
+        cleaned.append("\n".join(kept))
+    return cleaned, removed
+
+
+def strip_boilerplate(documents, min_fraction=DEDUP_BOILERPLATE_MIN_FRACTION):
+    """Run ``strip_repeated_lines`` on each document's pages separately.
+
+    ``documents`` is a list of page lists (one per uploaded file). Headers
+    are per document, so pooling pages from files of different lengths would
+    hide a short file's header behind the long file's page count. Returns
+    ``(pages, removed_line_count)`` with the pages of all documents in order.
+    """
+    pages = []
+    removed = 0
+    for document_pages in documents:
+        cleaned, n = strip_repeated_lines(document_pages, min_fraction)
+        pages.extend(cleaned)
+        removed += n
+    return pages, removed
+
+
+# ---------- MINHASH ----------
+
+def _shingles(text, size=DEDUP_SHINGLE_SIZE):
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text):
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in _shingles(text)), dtype=np.uint64
+    )
+    # (a * x + b) mod p per permutation, min over shingles
+    permuted = np.bitwise_and((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME, _MAX_HASH)
+    return permuted.min(axis=0)
+
+
+def _bands(signature):
+    rows = NUM_PERM // LSH_BANDS
+    return [(b, signature[b * rows:(b + 1) * rows].tobytes()) for b in range(LSH_BANDS)]
+
+
+# ---------- CHUNK DEDUP ----------
+
+def dedup_chunks(docs, threshold=DEDUP_NEAR_THRESHOLD):
+    """Drop exact and near-duplicate chunks, keeping the first occurrence.
+
+    Returns ``(kept_docs, stats)``.
+    """
+    seen_hashes = set()
+    buckets = {}
+    signatures = []
+    kept = []
+    exact = near = 0
+
+    for doc in docs:
+        normalized = _normalize(doc.page_content)
+        digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+        if digest in seen_hashes:
+            exact += 1
+            continue
+
+        signature = minhash_signature(normalized)
+        candidates = set()
+        for band in _bands(signature):
+            candidates.update(buckets.get(band, ()))
+
+        if any(np.mean(signatures[c] == signature) >= threshold for c in candidates):
+            near += 1
+            continue
+
+        seen_hashes.add(digest)
+        position = len(kept)
+        for band in _bands(signature):
+            buckets.setdefault(band, []).append(position)
+        signatures.append(signature)
+        kept.append(doc)
+
+    return kept, {
+        "chunks_in": len(docs),
+        "chunks_out": len(kept),
+        "exact_duplicates": exact,
+        "near_duplicates": near,
+        "chars_in": sum(len(d.page_content) for d in docs),
+        "chars_out": sum(len(d.page_content) for d in kept),
+    }
@@ -0,0 +1,109 @@
+"""Recall@k, query latency and memory for each FAISS index type.
+
+Usage:
+    python -m app.index_bench --synthetic 200000
+    python -m app.index_bench --corpus manuals.txt --queries 500
+
+Synthetic mode uses clustered unit vectors with the embedding model's
+dimension so large corpora can be benchmarked without embedding them;
+corpus mode embeds real chunks once and reuses them for every index type.
+Recall is measured against exact (flat) search on the same vectors.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.config import RAG_TOP_K, FAISS_NPROBE, FAISS_EF_SEARCH
+from app.vector_index import (
+    INDEX_TYPES,
+    index_memory_bytes,
+    make_index,
+    train_index,
+    tune_index,
+)
+
+EMBEDDING_DIM = 384
+
+
+def synthetic_vectors(n, dim=EMBEDDING_DIM, n_clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, n)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def corpus_vectors(path):
+    from app.rag_pipeline import get_embedding_model, split_texts
+
+    with open(path, encoding="utf-8") as f:
+        docs = split_texts([f.read()])
+    return np.asarray(
+        get_embedding_model().embed_documents([d.page_content for d in docs]), dtype="float32"
+    )
+
+
+def benchmark(vectors, queries, k=RAG_TOP_K, nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH):
+    dim = vectors.shape[1]
+    results = {}
+    truth = None
+
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = make_index(dim, len(vectors), index_type)
+        train_index(index, vectors)
+        index.add(vectors)
+        tune_index(index, nprobe=nprobe, ef_search=ef_search)
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        found = []
+        for query in queries:
+            t0 = time.perf_counter()
+            _, ids = index.search(query[None, :], k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found.append(ids[0])
+        found = np.stack(found)
+
+        if truth is None:
+            # flat is first in INDEX_TYPES and is the exact ground truth
+            truth = found
+
+        recall = np.mean([
+            len(set(f.tolist()) & set(t.tolist())) / k for f, t in zip(found, truth)
+        ])
+        latencies.sort()
+        results[index_type] = {
+            f"recall@{k}": round(float(recall), 4),
+            "p50_ms": round(latencies[len(latencies) // 2], 3),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+            "memory_mb": round(index_memory_bytes(index) / 2**20, 1),
+            "build_s": round(build_s, 2),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", type=int, default=50000, help="Number of synthetic vectors")
+    source.add_argument("--corpus", help="Text file to split and embed")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=RAG_TOP_K)
+    parser.add_argument("--nprobe", type=int, default=FAISS_NPROBE)
+    parser.add_argument("--ef-search", type=int, default=FAISS_EF_SEARCH)
+    args = parser.parse_args()
+
+    vectors = corpus_vectors(args.corpus) if args.corpus else synthetic_vectors(args.synthetic)
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors, like paraphrased questions.
+    queries = vectors[rng.choice(len(vectors), args.queries)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, nprobe={args.nprobe}, efSearch={args.ef_search}")
+    for index_type, r in benchmark(vectors, queries, args.k, args.nprobe, args.ef_search).items():
+        print(f"{index_type:>7}: " + "  ".join(f"{key}={value}" for key, value in r.items()))
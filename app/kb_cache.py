@@ -0,0 +1,125 @@
+"""Memory-bounded LRU of loaded per-clinic knowledge bases.
+
+Each namespace is loaded on its first query and kept until the total size of
+loaded namespaces exceeds the budget, at which point the least recently used
+ones are evicted. Loading takes a per-namespace lock only, so one clinic's
+slow load or re-index never blocks another clinic's queries. Entries are
+keyed on the index file's mtime/size, so a rebuild (in this process or any
+other) is picked up on the next query.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ("knowledge_base", "fingerprint", "nbytes")
+
+    def __init__(self, knowledge_base, fingerprint, nbytes):
+        self.knowledge_base = knowledge_base
+        self.fingerprint = fingerprint
+        self.nbytes = nbytes
+
+
+class KnowledgeBaseCache:
+    def __init__(self, loader, paths, max_bytes):
+        """
+        Args:
+            loader: namespace -> loaded knowledge base
+            paths: namespace -> files backing it; the first one is the index
+            max_bytes: budget for all loaded namespaces (on-disk size as proxy)
+        """
+        self._loader = loader
+        self._paths = paths
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._namespace_locks = {}
+
+    def _fingerprint(self, namespace):
+        try:
+            st = os.stat(self._paths(namespace)[0])
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _size_on_disk(self, namespace):
+        total = 0
+        for path in self._paths(namespace):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _lookup(self, namespace, fingerprint):
+        entry = self._entries.get(namespace)
+        if entry is not None and entry.fingerprint == fingerprint:
+            self._entries.move_to_end(namespace)
+            return entry
+        return None
+
+    def get(self, namespace, default=None):
+        """Loaded knowledge base for ``namespace``, or ``default`` when it has none."""
+        fingerprint = self._fingerprint(namespace)
+        if fingerprint is None:
+            self.invalidate(namespace)
+            return default
+
+        with self._lock:
+            entry = self._lookup(namespace, fingerprint)
+            if entry is not None:
+                return entry.knowledge_base
+            namespace_lock = self._namespace_locks.setdefault(namespace, threading.Lock())
+
+        with namespace_lock:
+            # Another thread may have loaded it while we waited.
+            with self._lock:
+                entry = self._lookup(namespace, fingerprint)
+                if entry is not None:
+                    return entry.knowledge_base
+
+            knowledge_base = self._loader(namespace)
+            entry = _Entry(knowledge_base, fingerprint, self._size_on_disk(namespace))
+
+            with self._lock:
+                self._entries[namespace] = entry
+                self._entries.move_to_end(namespace)
+                self._evict_locked(self.max_bytes, keep=namespace)
+
+        return knowledge_base
+
+    def _evict_locked(self, max_bytes, keep=None):
+        evicted = 0
+        total = sum(e.nbytes for e in self._entries.values())
+        for namespace in list(self._entries):
+            if total <= max_bytes:
+                break
+            if namespace == keep:
+                continue
+            total -= self._entries.pop(namespace).nbytes
+            evicted += 1
+        return evicted
+
+    def shrink(self, max_bytes):
+        """Evict least recently used namespaces until under ``max_bytes``; returns count evicted."""
+        with self._lock:
+            return self._evict_locked(max_bytes)
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._entries.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """``{namespace: bytes}`` for loaded namespaces, least recently used first."""
+        with self._lock:
+            return {namespace: e.nbytes for namespace, e in self._entries.items()}
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
@@ -8,14 +8,18 @@ if ROOT_DIR not in sys.path:
 import streamlit as st
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from models.llm import get_chatgroq_model
-from db.database import init_db, save_booking, get_all_bookings
+from db.database import init_db, save_booking, get_all_bookings, BookingNotSaved
+from db.archive import start_archiver
 from utils.email_utils import send_confirmation_email
 from app.booking_flow import handle_booking_flow, reset_booking
 from app.chat_logic import handle_user_message
-from app.rag_pipeline import build_vectorstore
+from app.rag_pipeline import build_vectorstore, NAMESPACE_PATTERN
+from app.chat_history import ChatHistory
+from app.config import DEFAULT_NAMESPACE, CHAT_RENDER_WINDOW, CHAT_CONTEXT_MESSAGES
 from app.admin_dashboard import admin_dashboard_page
+from utils import memory
+from utils.tracing import traced, turn
 import PyPDF2
-import time
 
 # ========== AMAZING CUSTOM STYLING ==========
 def inject_custom_css():
@@ -285,6 +289,7 @@ def is_booking_intent(text: str) -> bool:
 
 
 # ========== LLM CHAT RESPONSE ==========
+@traced("get_chat_response")
 def get_chat_response(chat_model, messages, system_prompt):
     formatted = [SystemMessage(content=system_prompt)]
     for m in messages:
@@ -295,6 +300,10 @@ def get_chat_response(chat_model, messages, system_prompt):
     return chat_model.invoke(formatted).content
 
 
+def load_earlier_messages():
+    st.session_state.history_window += CHAT_RENDER_WINDOW
+
+
 # ========== MAIN CHAT PAGE WITH STUNNING UI ==========
 def chat_page():
     # Page layout
@@ -304,8 +313,10 @@ def chat_page():
     system_prompt = "You are a professional, friendly medical appointment assistant. Help users book appointments, answer questions about healthcare, and provide guidance. Be empathetic and clear."
 
     # Initialize session state
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = ChatHistory()
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = CHAT_RENDER_WINDOW
     if "booking_mode" not in st.session_state:
         st.session_state.booking_mode = False
     if "awaiting_confirmation" not in st.session_state:
@@ -313,9 +324,12 @@ def chat_page():
     if "booking_data" not in st.session_state:
         st.session_state.booking_data = reset_booking()
 
+    history = st.session_state.chat_history
+
     # Display welcome message if no messages
-    if not st.session_state.messages:
-        col1, col2, col3 = st.columns([1, 1, 1])
+    welcome = st.empty()
+    if not len(history):
+        col1, col2, col3 = welcome.container().columns([1, 1, 1])
         with col2:
             st.markdown("""
             <div style='text-align: center; padding: 2rem; background: linear-gradient(135deg, rgba(102, 126, 234, 0.1), rgba(118, 75, 162, 0.1)); 
@@ -328,16 +342,23 @@ def chat_page():
     # Chat messages container
     chat_container = st.container()
     
+    # Only the latest window is rendered, so reruns stay flat as the chat grows
     with chat_container:
-        for msg in st.session_state.messages:
+        first = max(0, len(history) - st.session_state.history_window)
+        if first:
+            st.button(f"⬆️ Load earlier messages ({first} more)", on_click=load_earlier_messages)
+
+        for msg in history.messages(first):
             with st.chat_message(msg["role"], avatar="👤" if msg["role"] == "user" else "🤖"):
                 st.markdown(msg["content"])
 
     # Chat input
-    if prompt := st.chat_input("💬 Type your message here...", key=f"input_{len(st.session_state.messages)}"):
-        
+    if prompt := st.chat_input("💬 Type your message here...", key="chat_input"):
+        welcome.empty()
+        st.session_state.history_window = CHAT_RENDER_WINDOW
+
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        history.append("user", prompt)
         
         with st.chat_message("user", avatar="👤"):
             st.markdown(prompt)
@@ -345,22 +366,28 @@ def chat_page():
         # Generate response
         assistant_response = ""
 
-        # Booking confirmation flow
-        if st.session_state.awaiting_confirmation:
-            if prompt.lower() == "yes":
-                booking_id = save_booking(st.session_state.booking_data)
-                
-                try:
-                    send_confirmation_email(
-                        st.session_state.booking_data["email"],
-                        booking_id,
-                        st.session_state.booking_data
-                    )
-                    email_status = "✅ Confirmation email sent!"
-                except Exception as e:
-                    email_status = "⚠️ Email couldn't be sent, but booking is confirmed!"
-
-                booking_info = f"""
+        with turn(label=prompt[:60]):
+            # Booking confirmation flow
+            if st.session_state.awaiting_confirmation:
+                if prompt.lower() == "yes":
+                    try:
+                        booking_id = save_booking(st.session_state.booking_data)
+                    except BookingNotSaved:
+                        booking_id = None
+                        assistant_response = "⚠️ Your booking could not be saved right now. Type **yes** to try again or **no** to cancel."
+
+                    if booking_id is not None:
+                        try:
+                            send_confirmation_email(
+                                st.session_state.booking_data["email"],
+                                booking_id,
+                                st.session_state.booking_data
+                            )
+                            email_status = "✅ Confirmation email sent!"
+                        except Exception as e:
+                            email_status = "⚠️ Email couldn't be sent, but booking is confirmed!"
+
+                        booking_info = f"""
 **🎉 APPOINTMENT CONFIRMED!**
 
 **Booking Details:**
@@ -374,54 +401,61 @@ def chat_page():
 {email_status}
 
 Is there anything else I can help you with?
-                """
-                assistant_response = booking_info
+                        """
+                        assistant_response = booking_info
                 
-                st.session_state.booking_mode = False
-                st.session_state.awaiting_confirmation = False
-                st.session_state.booking_data = reset_booking()
+                        st.session_state.booking_mode = False
+                        st.session_state.awaiting_confirmation = False
+                        st.session_state.booking_data = reset_booking()
                 
-            elif prompt.lower() == "no":
-                assistant_response = "❌ Booking cancelled. No problem! Feel free to book again whenever you're ready."
-                st.session_state.booking_mode = False
-                st.session_state.awaiting_confirmation = False
-                st.session_state.booking_data = reset_booking()
+                elif prompt.lower() == "no":
+                    assistant_response = "❌ Booking cancelled. No problem! Feel free to book again whenever you're ready."
+                    st.session_state.booking_mode = False
+                    st.session_state.awaiting_confirmation = False
+                    st.session_state.booking_data = reset_booking()
+                else:
+                    assistant_response = "Please type **yes** to confirm or **no** to cancel your booking."
+
+            # Booking flow
+            elif st.session_state.booking_mode:
+                assistant_response = handle_booking_flow(prompt, st.session_state.booking_data)
+                if "Type **yes** to confirm" in assistant_response:
+                    st.session_state.awaiting_confirmation = True
+
+            # Normal chat with RAG
             else:
-                assistant_response = "Please type **yes** to confirm or **no** to cancel your booking."
-
-        # Booking flow
-        elif st.session_state.booking_mode:
-            assistant_response = handle_booking_flow(prompt, st.session_state.booking_data)
-            if "Type **yes** to confirm" in assistant_response:
-                st.session_state.awaiting_confirmation = True
-
-        # Normal chat with RAG
-        else:
-            tool_reply = handle_user_message(prompt)
+                tool_reply = handle_user_message(
+                    prompt, namespace=st.session_state.get("active_clinic", DEFAULT_NAMESPACE)
+                )
             
-            if tool_reply:
-                assistant_response = tool_reply
-            elif is_booking_intent(prompt):
-                st.session_state.booking_mode = True
-                assistant_response = "📝 Great! Let's book your appointment. **What's your full name?**"
-            else:
-                assistant_response = get_chat_response(chat_model, st.session_state.messages, system_prompt)
+                if tool_reply:
+                    assistant_response = tool_reply
+                elif is_booking_intent(prompt):
+                    st.session_state.booking_mode = True
+                    assistant_response = "📝 Great! Let's book your appointment. **What's your full name?**"
+                else:
+                    assistant_response = get_chat_response(
+                        chat_model, history.recent(CHAT_CONTEXT_MESSAGES), system_prompt
+                    )
 
         # Display assistant response
         with st.chat_message("assistant", avatar="🤖"):
             st.markdown(assistant_response)
 
-        st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-        
-        # Auto-scroll
-        time.sleep(0.5)
-        st.rerun()
+        history.append("assistant", assistant_response)
+        memory.check_budgets()
 
 
 # ========== SIDEBAR & PDF UPLOAD ==========
 with st.sidebar:
     st.markdown("<h2 style='font-size: 1.3rem; color: #e0e7ff;'>📚 Knowledge Base</h2>", unsafe_allow_html=True)
     st.markdown("<p style='color: #c7d2fe;'>Upload PDFs to enhance responses</p>", unsafe_allow_html=True)
+
+    clinic = st.text_input("🏥 Clinic ID", value=DEFAULT_NAMESPACE, key="clinic").strip()
+    if not NAMESPACE_PATTERN.match(clinic):
+        st.error("Clinic ID may only contain letters, numbers, '-' and '_'")
+        clinic = DEFAULT_NAMESPACE
+    st.session_state.active_clinic = clinic
     
     uploaded_files = st.file_uploader(
         "Select PDF files",
@@ -430,24 +464,37 @@ with st.sidebar:
         key="sidebar_pdf_upload"
     )
 
-    if uploaded_files:
+    # The uploader keeps its files across reruns; only index a new selection once.
+    upload_key = (clinic, tuple((f.name, f.size) for f in uploaded_files or []))
+
+    if uploaded_files and st.session_state.get("indexed_upload") != upload_key:
         progress_bar = st.progress(0)
-        texts = []
+        documents = []
         
         for idx, file in enumerate(uploaded_files):
             try:
                 reader = PyPDF2.PdfReader(file)
-                for page in reader.pages:
-                    if page.extract_text():
-                        texts.append(page.extract_text())
+                # Keep pages grouped per file so headers are detected per document.
+                pages = [text for text in (page.extract_text() for page in reader.pages) if text]
+                if pages:
+                    documents.append(pages)
                 progress_bar.progress((idx + 1) / len(uploaded_files))
             except Exception as e:
                 st.error(f"Error reading {file.name}")
 
-        if texts:
+        if documents:
             with st.spinner("🔄 Processing documents..."):
-                build_vectorstore(texts)
-            st.success(f"✅ Indexed {len(uploaded_files)} document(s)!")
+                stats = build_vectorstore(documents, namespace=clinic)
+            st.session_state.indexed_upload = upload_key
+            st.success(f"✅ Indexed {len(uploaded_files)} document(s) for {clinic}!")
+
+            removed = stats["exact_duplicates"] + stats["near_duplicates"]
+            if removed or stats["boilerplate_lines"]:
+                st.caption(
+                    f"🧹 {stats['chunks_out']} chunks kept, {removed} duplicates and "
+                    f"{stats['boilerplate_lines']} header/footer lines removed "
+                    f"(index {stats['shrink']:.0%} smaller)"
+                )
     
     st.markdown("---")
 
@@ -455,6 +502,7 @@ with st.sidebar:
 # ========== MAIN APPLICATION ==========
 def main():
     init_db()
+    start_archiver()
 
     st.set_page_config(
         page_title="Doctor Appointment Assistant",
@@ -0,0 +1,117 @@
+"""Synthetic workload that fails when memory keeps growing.
+
+Each round opens a batch of chat sessions, fills them past the in-memory
+window so they spill, reads their render windows, queries a set of clinic
+knowledge bases through a small ``KnowledgeBaseCache``, and then lets the
+sessions expire. After a warm-up round a tracemalloc baseline is taken. The
+check fails (exit code 1) in either case:
+- Python allocations grow by more than ``--max-growth-mb`` over the
+  remaining rounds.
+- Expired sessions are still accounted for.
+
+Usage:
+    python -m app.memory_check
+    python -m app.memory_check --rounds 20 --sessions 100
+    python -m app.memory_check --simulate-leak   # should fail
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from app.chat_history import ChatHistory, sessions_memory_bytes
+from app.config import CHAT_MEMORY_MESSAGES, CHAT_RENDER_WINDOW
+from app.kb_cache import KnowledgeBaseCache
+from utils import memory
+
+EMBEDDING_DIM = 384
+_leaked = []
+
+
+def _synthetic_knowledge_bases(directory, n_namespaces, vectors_per_namespace):
+    """Write one placeholder index file per namespace, sized like its vectors."""
+    nbytes = vectors_per_namespace * EMBEDDING_DIM * 4
+    for i in range(n_namespaces):
+        with open(os.path.join(directory, f"clinic-{i}.bin"), "wb") as f:
+            f.truncate(nbytes)
+
+    def paths(namespace):
+        return (os.path.join(directory, f"{namespace}.bin"),)
+
+    def loader(namespace):
+        return np.ones((vectors_per_namespace, EMBEDDING_DIM), dtype="float32")
+
+    return paths, loader
+
+
+def run_round(spill_dir, cache, n_sessions, n_messages, n_namespaces, simulate_leak=False):
+    histories = [ChatHistory(spill_dir=spill_dir) for _ in range(n_sessions)]
+    for s, history in enumerate(histories):
+        for m in range(n_messages):
+            role = "user" if m % 2 == 0 else "assistant"
+            history.append(role, f"session {s} message {m}: " + "lorem ipsum " * 40)
+            if m % 10 == 0:
+                history.messages(len(history) - CHAT_RENDER_WINDOW)
+        cache.get(f"clinic-{s % n_namespaces}")
+
+    if simulate_leak:
+        _leaked.extend(histories)
+    del histories
+    gc.collect()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory growth check on a synthetic workload")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=CHAT_MEMORY_MESSAGES + 50)
+    parser.add_argument("--namespaces", type=int, default=8)
+    parser.add_argument("--vectors", type=int, default=2000, help="vectors per namespace")
+    parser.add_argument("--cache-mb", type=float, default=8)
+    parser.add_argument("--max-growth-mb", type=float, default=1.0)
+    parser.add_argument("--simulate-leak", action="store_true", help="keep every session alive")
+    args = parser.parse_args(argv)
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(memory.MEMORY_TRACEMALLOC_FRAMES)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, loader = _synthetic_knowledge_bases(tmp, args.namespaces, args.vectors)
+        cache = KnowledgeBaseCache(loader=loader, paths=paths, max_bytes=int(args.cache_mb * 2**20))
+        memory.register("vector_stores", cache.memory_bytes, shed=cache.shrink)
+
+        def one_round():
+            run_round(tmp, cache, args.sessions, args.messages, args.namespaces, args.simulate_leak)
+
+        one_round()
+        memory.take_baseline()
+        start_mb = tracemalloc.get_traced_memory()[0] / 2**20
+
+        for _ in range(args.rounds - 1):
+            one_round()
+
+        growth_mb = tracemalloc.get_traced_memory()[0] / 2**20 - start_mb
+        live_sessions_mb = sessions_memory_bytes() / 2**20
+
+        print(f"{'component':<18}{'MB':>10}")
+        for row in memory.report():
+            print(f"{row['component']:<18}{row['mb']:>10.2f}")
+        print(f"\ntraced growth over {args.rounds - 1} rounds: {growth_mb:.2f} MB "
+              f"(limit {args.max_growth_mb} MB)")
+        for row in memory.growth_since_baseline(limit=5):
+            print(f"  +{row['kb_diff']:>9.1f} KB  {row['location']}")
+
+    failed = growth_mb > args.max_growth_mb or live_sessions_mb > 0
+    if live_sessions_mb > 0:
+        print(f"expired sessions still hold {live_sessions_mb:.2f} MB")
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Thin client for the retrieval sidecar (``app.rag_server``).
+
+Messages are length-prefixed JSON over a Unix domain socket. Connections are
+kept in a small pool and reused across queries; a broken pooled connection
+(for example after the sidecar restarted) is retried once on a fresh one.
+"""
+
+import json
+import queue
+import socket
+import struct
+import threading
+
+from app.config import RAG_SIDECAR_POOL_SIZE, RAG_SIDECAR_TIMEOUT_S
+
+_HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+# Texts per embed request: small enough to finish well inside the socket
+# timeout, and the reply (~8 KB of JSON per 384-d vector) far below the limit.
+EMBED_BATCH_SIZE = 32
+
+
+class SidecarError(RuntimeError):
+    """The sidecar answered, but with an error."""
+
+
+# ---------- WIRE PROTOCOL ----------
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def send_message(sock, payload):
+    body = json.dumps(payload).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def recv_message(sock):
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if length > MAX_MESSAGE_BYTES:
+        raise ConnectionError(f"message too large: {length} bytes")
+    return json.loads(_recv_exact(sock, length))
+
+
+# ---------- CLIENT ----------
+
+class RagClient:
+    def __init__(self, socket_path, pool_size=RAG_SIDECAR_POOL_SIZE, timeout=RAG_SIDECAR_TIMEOUT_S):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _release(self, sock):
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def request(self, payload):
+        for attempt in range(2):
+            try:
+                sock = self._pool.get_nowait()
+                pooled = True
+            except queue.Empty:
+                sock = self._connect()
+                pooled = False
+
+            try:
+                send_message(sock, payload)
+                response = recv_message(sock)
+            except (OSError, ValueError):
+                sock.close()
+                # A stale pooled socket gets one retry on a fresh connection.
+                if pooled and attempt == 0:
+                    continue
+                raise
+
+            self._release(sock)
+            if not response.get("ok"):
+                raise SidecarError(response.get("error", "unknown sidecar error"))
+            return response.get("result")
+
+    def search(self, query, k, namespace):
+        """Chunk texts for ``query`` from the sidecar's copy of ``namespace``."""
+        return self.request({"op": "search", "query": query, "k": k, "namespace": namespace})
+
+    def embed(self, texts):
+        """Embeddings for ``texts``, sent in batches of ``EMBED_BATCH_SIZE``."""
+        texts = list(texts)
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[start:start + EMBED_BATCH_SIZE]
+            # JSON escaping can grow text up to 6x; keep every request under the limit.
+            if sum(len(t) for t in batch) * 6 > MAX_MESSAGE_BYTES:
+                raise ValueError("embed batch too large for one sidecar message")
+            vectors.extend(self.request({"op": "embed", "texts": batch}))
+        return vectors
+
+    def ping(self):
+        return self.request({"op": "ping"})
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(socket_path):
+    with _clients_lock:
+        client = _clients.get(socket_path)
+        if client is None:
+            client = _clients[socket_path] = RagClient(socket_path)
+        return client
@@ -0,0 +1,103 @@
+"""Offline retrieval eval: hit@k and latency for dense, BM25 and hybrid modes.
+
+Usage:
+    python -m app.rag_eval
+    python -m app.rag_eval --corpus clinic_faq.txt --queries queries.jsonl
+
+``--corpus`` is a text file with one document per blank-line separated
+block; ``--queries`` is JSONL with ``{"query": ..., "expected": ...}`` where
+``expected`` is a substring the right chunk must contain.
+"""
+
+import argparse
+import json
+import time
+
+from app.config import RAG_TOP_K
+from app.rag_pipeline import build_indexes, retrieve, split_texts
+
+SAMPLE_CORPUS = [
+    "What to bring: please bring your insurance card, a photo ID and a list of current "
+    "medications to every appointment. New patients should arrive 15 minutes early to "
+    "complete registration forms.",
+    "Fasting before blood test: for a fasting blood test do not eat or drink anything "
+    "except water for 8 to 12 hours before your appointment. Take regular medications "
+    "unless your doctor told you otherwise.",
+    "Clinic timings: the clinic is open Monday to Friday from 9:00 AM to 5:00 PM. We are "
+    "closed on weekends and public holidays.",
+    "Cancellation policy: appointments can be cancelled or rescheduled up to 24 hours in "
+    "advance at no charge. Late cancellations may incur a fee.",
+    "Services: general consultation, pediatrics, vaccinations, blood tests, ECG and minor "
+    "procedures are available at the clinic.",
+    "Parking and access: free parking is available behind the building. The clinic is "
+    "wheelchair accessible through the main entrance.",
+    "Test results: lab results are usually ready within two working days and are shared "
+    "through the patient portal or by phone.",
+    "Doctors: Dr. Mehta (general medicine), Dr. Rao (pediatrics) and Dr. Iyer (cardiology) "
+    "see patients on weekdays.",
+]
+
+SAMPLE_QUERIES = [
+    {"query": "insurance card", "expected": "insurance card"},
+    {"query": "fasting before blood test", "expected": "do not eat"},
+    {"query": "What are the clinic timings?", "expected": "9:00 AM to 5:00 PM"},
+    {"query": "Can I cancel my appointment?", "expected": "24 hours"},
+    {"query": "Is there a children's doctor?", "expected": "pediatrics"},
+    {"query": "where do I park my car", "expected": "free parking"},
+    {"query": "how long until my lab results come back", "expected": "two working days"},
+    {"query": "heart specialist", "expected": "cardiology"},
+]
+
+MODES = ("dense", "bm25", "hybrid")
+
+
+def _load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [block.strip() for block in f.read().split("\n\n") if block.strip()]
+
+
+def _load_queries(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def evaluate(corpus, queries, k=RAG_TOP_K, repeats=5):
+    """Return hit@k and query latency per retrieval mode."""
+    vectorstore, bm25 = build_indexes(split_texts(corpus))
+
+    results = {}
+    for mode in MODES:
+        hits = 0
+        latencies = []
+        for item in queries:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                docs = retrieve(item["query"], vectorstore, bm25, k=k, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+            if any(item["expected"].lower() in d.page_content.lower() for d in docs):
+                hits += 1
+        results[mode] = {
+            f"hit@{k}": round(hits / len(queries), 3),
+            "p50_ms": round(_percentile(latencies, 50), 3),
+            "p95_ms": round(_percentile(latencies, 95), 3),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline RAG retrieval eval")
+    parser.add_argument("--corpus", help="Text file, documents separated by blank lines")
+    parser.add_argument("--queries", help="JSONL with query/expected pairs")
+    parser.add_argument("--k", type=int, default=RAG_TOP_K)
+    args = parser.parse_args()
+
+    corpus = _load_corpus(args.corpus) if args.corpus else SAMPLE_CORPUS
+    queries = _load_queries(args.queries) if args.queries else SAMPLE_QUERIES
+
+    for mode, r in evaluate(corpus, queries, k=args.k).items():
+        print(f"{mode:>7}: " + "  ".join(f"{key}={value}" for key, value in r.items()))
@@ -1,19 +1,56 @@
+import logging
 import os
 import pickle
+import re
+import threading
+import time
+import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_core.documents import Document
+from app.bm25 import BM25Index, reciprocal_rank_fusion
+from app.config import (
+    RAG_TOP_K,
+    RAG_FUSION_CANDIDATES,
+    RRF_K,
+    BM25_SKIP_DENSE_SCORE,
+    FAISS_INDEX_TYPE,
+    RAG_SIDECAR_SOCKET,
+    RAG_SIDECAR_RETRY_S,
+    DEFAULT_NAMESPACE,
+    KB_CACHE_MAX_MB,
+    DEDUP_ENABLED,
+)
+from app.dedup import dedup_chunks, strip_boilerplate
+from app.kb_cache import KnowledgeBaseCache
+from app.rag_client import SidecarError, get_client
+from app.vector_index import make_index, train_index, tune_index
+from models.embeddings import get_embedding_backend
+from utils import memory
+from utils.tracing import span, traced
 
 VECTOR_DIR = "data/vectorstore"
-INDEX_PATH = os.path.join(VECTOR_DIR, "faiss_index.pkl")
+INDEX_FILE = "faiss_index.pkl"
+BM25_FILE = "bm25_index.pkl"
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
 
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+logger = logging.getLogger(__name__)
+
+_embedding_model = None
+# After a failed sidecar call, skip it until this monotonic time
+_sidecar_down_until = 0.0
+
+
+def get_embedding_model():
+    """Process-wide embedding backend (``EMBEDDING_BACKEND``), created on first use."""
+    global _embedding_model
+    if _embedding_model is None:
+        _embedding_model = get_embedding_backend()
+    return _embedding_model
 
 
-def build_vectorstore(texts):
+def split_texts(texts):
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=500,
         chunk_overlap=100
@@ -23,30 +60,317 @@ def build_vectorstore(texts):
     for text in texts:
         chunks = splitter.split_text(text)
         docs.extend([Document(page_content=c) for c in chunks])
+    return docs
+
+
+def embed_texts(texts):
+    """Chunk embeddings from the sidecar when one is configured, else from the local model.
+
+    Going through the sidecar keeps uploading workers from loading their own
+    copy of the model.
+    """
+    global _sidecar_down_until
+    if RAG_SIDECAR_SOCKET and time.monotonic() >= _sidecar_down_until:
+        try:
+            with span("rag.sidecar_embed"):
+                return get_client(RAG_SIDECAR_SOCKET).embed(texts)
+        except SidecarError:
+            # The sidecar is up but refused this request; keep using it for others.
+            logger.warning("RAG sidecar rejected embed request, embedding in-process", exc_info=True)
+        except (OSError, ValueError):
+            logger.warning("RAG sidecar unavailable, embedding in-process", exc_info=True)
+            _sidecar_down_until = time.monotonic() + RAG_SIDECAR_RETRY_S
+
+    return get_embedding_model().embed_documents(texts)
+
+
+def build_faiss(docs, index_type=FAISS_INDEX_TYPE, embeddings=None):
+    """FAISS store over ``docs`` using a flat, HNSW or IVF index (see ``app.vector_index``)."""
+    texts = [d.page_content for d in docs]
+    if embeddings is None:
+        embeddings = embed_texts(texts)
+    vectors = np.asarray(embeddings, dtype="float32")
+
+    index = make_index(vectors.shape[1], len(vectors), index_type)
+    train_index(index, vectors)
+    tune_index(index)
+
+    vectorstore = FAISS(
+        embedding_function=get_embedding_model(),
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
+    vectorstore.add_embeddings(
+        list(zip(texts, vectors.tolist())),
+        metadatas=[d.metadata for d in docs]
+    )
+    return vectorstore
+
+
+def build_indexes(docs, index_type=FAISS_INDEX_TYPE):
+    """Dense FAISS store and BM25 index over the same chunks, in the same order."""
+    with span("rag.embed_index"):
+        vectorstore = build_faiss(docs, index_type)
+
+    with span("rag.bm25_index"):
+        bm25 = BM25Index.build([d.page_content for d in docs])
+
+    return vectorstore, bm25
+
 
-    vectorstore = FAISS.from_documents(docs, embedding_model)
+# ---------- NAMESPACES ----------
+
+def namespace_dir(namespace=DEFAULT_NAMESPACE):
+    """Directory holding one clinic's knowledge base."""
+    if not NAMESPACE_PATTERN.match(namespace):
+        raise ValueError(f"Invalid knowledge base namespace: {namespace!r}")
+
+    path = os.path.join(VECTOR_DIR, namespace)
+    legacy_index = os.path.join(VECTOR_DIR, INDEX_FILE)
+    # Single-tenant stores predate namespaces and live directly in VECTOR_DIR.
+    if namespace == DEFAULT_NAMESPACE and not os.path.isdir(path) and os.path.exists(legacy_index):
+        return VECTOR_DIR
+    return path
+
+
+def index_paths(namespace=DEFAULT_NAMESPACE):
+    """``(faiss_path, bm25_path)`` for ``namespace``."""
+    directory = namespace_dir(namespace)
+    return os.path.join(directory, INDEX_FILE), os.path.join(directory, BM25_FILE)
+
+
+def list_namespaces():
+    if not os.path.isdir(VECTOR_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(VECTOR_DIR)
+        if NAMESPACE_PATTERN.match(name) and os.path.exists(os.path.join(VECTOR_DIR, name, INDEX_FILE))
+    )
+
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def _build_lock(namespace):
+    with _build_locks_guard:
+        return _build_locks.setdefault(namespace, threading.Lock())
+
+
+def prepare_chunks(documents, dedup=DEDUP_ENABLED):
+    """Split documents into chunks, stripping boilerplate and duplicates.
+
+    ``documents`` holds one list of page texts per uploaded file; a plain
+    string counts as a one-page document. Returns ``(docs, stats)`` where stats reports how much dedup removed.
+    ``page_chars_in``/``page_chars_out`` are the page text before and after
+    header/footer stripping; ``shrink`` is the overall share of text removed
+    by stripping and chunk dedup together.
+    """
+    documents = [[d] if isinstance(d, str) else list(d) for d in documents]
+    page_chars_in = sum(len(page) for pages in documents for page in pages)
+    boilerplate_lines = 0
+    if dedup:
+        with span("rag.strip_boilerplate"):
+            texts, boilerplate_lines = strip_boilerplate(documents)
+    else:
+        texts = [page for pages in documents for page in pages]
+    page_chars_out = sum(len(t) for t in texts)
+
+    with span("rag.split"):
+        docs = split_texts(texts)
+
+    if not dedup:
+        chars = sum(len(d.page_content) for d in docs)
+        return docs, {
+            "chunks_in": len(docs), "chunks_out": len(docs),
+            "exact_duplicates": 0, "near_duplicates": 0,
+            "chars_in": chars, "chars_out": chars, "boilerplate_lines": 0,
+            "page_chars_in": page_chars_in, "page_chars_out": page_chars_out, "shrink": 0.0,
+        }
+
+    with span("rag.dedup"):
+        docs, stats = dedup_chunks(docs)
+
+    # Chunks overlap, so chunk and page character counts are not comparable;
+    # combine the two stages as ratios instead.
+    kept = (page_chars_out / max(page_chars_in, 1)) * (stats["chars_out"] / max(stats["chars_in"], 1))
+    stats.update(
+        boilerplate_lines=boilerplate_lines,
+        page_chars_in=page_chars_in,
+        page_chars_out=page_chars_out,
+        shrink=1 - kept,
+    )
+    return docs, stats
 
-    os.makedirs(VECTOR_DIR, exist_ok=True)
-    with open(INDEX_PATH, "wb") as f:
-        pickle.dump(vectorstore, f)
 
+@traced("build_vectorstore")
+def build_vectorstore(documents, namespace=DEFAULT_NAMESPACE):
+    """Rebuild one clinic's knowledge base from ``documents`` (page lists, one per file).
 
-def load_vectorstore():
-    if not os.path.exists(INDEX_PATH):
+    Other namespaces are untouched.
+
+    Returns the ingestion stats from ``prepare_chunks``.
+    """
+    if not NAMESPACE_PATTERN.match(namespace):
+        raise ValueError(f"Invalid knowledge base namespace: {namespace!r}")
+    directory = os.path.join(VECTOR_DIR, namespace)
+
+    with _build_lock(namespace):
+        docs, stats = prepare_chunks(documents)
+        vectorstore, bm25 = build_indexes(docs)
+
+        with span("rag.persist"):
+            os.makedirs(directory, exist_ok=True)
+            # BM25 first: readers treat a new FAISS file as "index changed".
+            _atomic_pickle(bm25, os.path.join(directory, BM25_FILE))
+            _atomic_pickle(vectorstore, os.path.join(directory, INDEX_FILE))
+
+    kb_cache.invalidate(namespace)
+
+    removed = stats["exact_duplicates"] + stats["near_duplicates"]
+    logger.info(
+        "Indexed %d chunks for %s (%d duplicates and %d boilerplate lines removed)",
+        stats["chunks_out"], namespace, removed, stats["boilerplate_lines"]
+    )
+    return stats
+
+
+def _atomic_pickle(obj, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def load_vectorstore(namespace=DEFAULT_NAMESPACE):
+    index_path, _ = index_paths(namespace)
+    if not os.path.exists(index_path):
         return None
-    with open(INDEX_PATH, "rb") as f:
+    with open(index_path, "rb") as f:
+        vectorstore = pickle.load(f)
+    # The pickle only carries backend settings; share this process's model.
+    vectorstore.embedding_function = get_embedding_model()
+    # nprobe/efSearch are not persisted reliably; apply the configured values.
+    tune_index(vectorstore.index)
+    return vectorstore
+
+
+def load_bm25(namespace=DEFAULT_NAMESPACE):
+    # Stores built before hybrid retrieval have no BM25 index; they stay dense-only.
+    _, bm25_path = index_paths(namespace)
+    if not os.path.exists(bm25_path):
+        return None
+    with open(bm25_path, "rb") as f:
         return pickle.load(f)
 
 
-def rag_tool(query):
-    vectorstore = load_vectorstore()
+def load_knowledge_base(namespace=DEFAULT_NAMESPACE):
+    """``(vectorstore, bm25)``; bm25 is None when missing or built for a different index."""
+    vectorstore = load_vectorstore(namespace)
+    if vectorstore is None:
+        return None, None
+
+    bm25 = load_bm25(namespace)
+    if bm25 is not None and len(bm25) != vectorstore.index.ntotal:
+        # Caught mid-rebuild; stay dense-only until both files match.
+        bm25 = None
+    return vectorstore, bm25
+
+
+kb_cache = KnowledgeBaseCache(
+    loader=load_knowledge_base,
+    paths=index_paths,
+    max_bytes=KB_CACHE_MAX_MB * 2**20
+)
+
+# Loaded namespaces are sized by their files on disk, as in the cache budget.
+memory.register("vector_stores", kb_cache.memory_bytes, shed=kb_cache.shrink)
+memory.register(
+    "embedding_model",
+    lambda: _embedding_model.memory_bytes() if _embedding_model is not None else 0
+)
+
+
+def _doc_at(vectorstore, position):
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+
+
+def retrieve(query, vectorstore, bm25=None, k=RAG_TOP_K, mode="hybrid", embed_query=None):
+    """Top ``k`` chunks for ``query``.
+
+    ``mode`` is "dense", "bm25" or "hybrid". In hybrid mode a confident
+    lexical hit (contains every query term and its normalized BM25 score is
+    >= ``BM25_SKIP_DENSE_SCORE``) is returned without embedding the query; otherwise BM25 and FAISS results
+    are merged with reciprocal rank fusion. ``embed_query`` overrides how
+    the query is embedded (the sidecar server passes its batcher here).
+    """
+    lexical = []
+    if bm25 is not None and mode in ("bm25", "hybrid"):
+        with span("rag.bm25_search"):
+            lexical = bm25.search(query, k=RAG_FUSION_CANDIDATES)
+
+        lexical_docs = [_doc_at(vectorstore, doc_id) for doc_id, *_ in lexical]
+        confident = lexical and lexical[0][3] == 1.0 and lexical[0][2] >= BM25_SKIP_DENSE_SCORE
+        if mode == "bm25" or confident:
+            return lexical_docs[:k]
+
+    if mode == "bm25":
+        return []
+
+    n_dense = RAG_FUSION_CANDIDATES if lexical else k
+    with span("rag.similarity_search"):
+        if embed_query is None:
+            dense_docs = vectorstore.similarity_search(query, k=n_dense)
+        else:
+            dense_docs = vectorstore.similarity_search_by_vector(embed_query(query), k=n_dense)
+
+    if not lexical:
+        return dense_docs[:k]
+
+    by_content = {d.page_content: d for d in dense_docs + lexical_docs}
+    fused = reciprocal_rank_fusion(
+        [[d.page_content for d in lexical_docs], [d.page_content for d in dense_docs]],
+        k=RRF_K
+    )
+    return [by_content[c] for c in fused[:k]]
+
+
+@traced("rag_tool")
+def rag_tool(query, namespace=DEFAULT_NAMESPACE):
+    if RAG_SIDECAR_SOCKET:
+        chunks = _sidecar_search(query, namespace)
+        if chunks is not None:
+            return "\n\n".join(chunks) if chunks else None
+
+    with span("rag.load_vectorstore"):
+        vectorstore, bm25 = kb_cache.get(namespace, default=(None, None))
     if not vectorstore:
         return None
 
-    docs = vectorstore.similarity_search(query, k=3)
+    docs = retrieve(query, vectorstore, bm25)
 
     if not docs:
         return None
 
     return "\n\n".join(d.page_content for d in docs)
 
+
+def _sidecar_search(query, namespace):
+    """Chunks from the sidecar, or None to fall back to in-process retrieval."""
+    global _sidecar_down_until
+    if time.monotonic() < _sidecar_down_until:
+        return None
+
+    try:
+        with span("rag.sidecar_search"):
+            return get_client(RAG_SIDECAR_SOCKET).search(query, RAG_TOP_K, namespace)
+    except SidecarError:
+        # An application error (e.g. one clinic's bad index) says nothing about
+        # the sidecar's health, so other clinics keep using it.
+        logger.warning("RAG sidecar search failed for %s", namespace, exc_info=True)
+        return None
+    except (OSError, ValueError):
+        logger.warning("RAG sidecar unavailable, using in-process retrieval", exc_info=True)
+        _sidecar_down_until = time.monotonic() + RAG_SIDECAR_RETRY_S
+        return None
@@ -0,0 +1,170 @@
+"""Shared embedding/retrieval sidecar for multi-worker deployments.
+
+One process per node loads the embedding model and the vector store once and
+serves every Streamlit worker over a Unix domain socket, instead of each
+worker holding its own copy. Point workers at it with ``RAG_SIDECAR_SOCKET``;
+``rag_tool`` falls back to in-process retrieval whenever the sidecar is down.
+
+Query embeddings from concurrent requests are micro-batched: the first
+request waits up to ``RAG_SERVER_BATCH_WAIT_MS`` for others and the batch is
+embedded in one forward pass.
+
+Clinic knowledge bases are held in the same memory-bounded LRU as the
+in-process path (``rag_pipeline.kb_cache``). A namespace is reloaded when its
+index file changes on disk (checked on each search) and swapped in
+atomically, so a rebuilt knowledge base goes live without restarting workers
+or the sidecar. SIGHUP drops every loaded namespace.
+
+Usage:
+    python -m app.rag_server --socket /tmp/medibot-rag.sock
+"""
+
+import argparse
+import logging
+import os
+import queue
+import signal
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+
+from app import rag_pipeline
+from app.config import RAG_SIDECAR_SOCKET, RAG_SERVER_MAX_BATCH, RAG_SERVER_BATCH_WAIT_MS
+from app.rag_client import recv_message, send_message
+
+logger = logging.getLogger(__name__)
+
+
+class EmbedBatcher:
+    """Coalesces concurrent ``embed`` calls into batched ``embed_documents`` calls."""
+
+    def __init__(self, model, max_batch=RAG_SERVER_MAX_BATCH, max_wait_ms=RAG_SERVER_BATCH_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="embed-batcher", daemon=True).start()
+
+    def embed(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self.model.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Connections are pooled by clients, so serve requests until they hang up.
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+
+            try:
+                response = {"ok": True, "result": self.server.dispatch(request)}
+            except Exception as e:
+                logger.exception("Sidecar request failed")
+                response = {"ok": False, "error": str(e)}
+
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+class RagServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+        self.socket_path = socket_path
+        self.batcher = EmbedBatcher(rag_pipeline.get_embedding_model())
+        # Backends load lazily; load the model now so the first requests do not
+        # time out and send every worker to load its own copy.
+        started = time.monotonic()
+        self.batcher.model.embed_query("warmup")
+        logger.info("Embedding model loaded in %.1f s", time.monotonic() - started)
+
+    def dispatch(self, request):
+        op = request.get("op")
+
+        if op == "search":
+            namespace = request.get("namespace", rag_pipeline.DEFAULT_NAMESPACE)
+            vectorstore, bm25 = rag_pipeline.kb_cache.get(namespace, default=(None, None))
+            if vectorstore is None:
+                return []
+            docs = rag_pipeline.retrieve(
+                request["query"], vectorstore, bm25,
+                k=int(request.get("k", rag_pipeline.RAG_TOP_K)),
+                embed_query=self.batcher.embed
+            )
+            return [d.page_content for d in docs]
+
+        if op == "embed":
+            return rag_pipeline.get_embedding_model().embed_documents(request["texts"])
+
+        if op == "reload":
+            namespace = request.get("namespace")
+            if namespace:
+                rag_pipeline.kb_cache.invalidate(namespace)
+            else:
+                rag_pipeline.kb_cache.clear()
+            return True
+
+        if op == "ping":
+            return "pong"
+
+        raise ValueError(f"unknown op: {op}")
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def serve(socket_path=RAG_SIDECAR_SOCKET):
+    if not socket_path:
+        raise ValueError("No socket path: pass --socket or set RAG_SIDECAR_SOCKET")
+
+    server = RagServer(socket_path)
+    signal.signal(signal.SIGHUP, lambda *_: rag_pipeline.kb_cache.clear())
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info("RAG sidecar listening on %s", socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared embedding/retrieval sidecar")
+    parser.add_argument("--socket", default=RAG_SIDECAR_SOCKET or "/tmp/medibot-rag.sock")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    serve(args.socket)
@@ -1,10 +1,11 @@
+from app.config import DEFAULT_NAMESPACE
 from app.rag_pipeline import rag_tool
 from db.database import save_booking
 from utils.email_utils import send_confirmation_email
 
 
-def rag_search_tool(query):
-    return rag_tool(query)
+def rag_search_tool(query, namespace=DEFAULT_NAMESPACE):
+    return rag_tool(query, namespace=namespace)
 
 
 def booking_persistence_tool(booking_data):
@@ -0,0 +1,124 @@
+"""FAISS index construction: flat, HNSW and IVF with scalar/product quantization."""
+
+import logging
+import math
+
+import faiss
+import numpy as np
+
+from app.config import (
+    FAISS_INDEX_TYPE,
+    FAISS_AUTO_HNSW_MIN,
+    FAISS_AUTO_IVF_MIN,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_PQ_M,
+    FAISS_TRAIN_PER_LIST,
+    FAISS_NPROBE,
+    FAISS_EF_SEARCH,
+)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_sq", "ivf_pq")
+# Below these sizes k-means has too few points to train (PQ codebooks need
+# 2^8 points; IVF wants ~39 per list and a handful of lists to be useful).
+IVF_MIN_LISTS = 8
+MIN_TRAIN_VECTORS = {
+    "ivf_sq": 39 * IVF_MIN_LISTS,
+    "ivf_pq": max(256, 39 * IVF_MIN_LISTS),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def choose_index_type(n_vectors, index_type=FAISS_INDEX_TYPE):
+    if index_type != "auto":
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+        min_vectors = MIN_TRAIN_VECTORS.get(index_type, 0)
+        if n_vectors < min_vectors:
+            logger.info(
+                "Using a flat index for %d vectors: %s needs at least %d to train",
+                n_vectors, index_type, min_vectors
+            )
+            return "flat"
+        return index_type
+    if n_vectors < FAISS_AUTO_HNSW_MIN:
+        return "flat"
+    if n_vectors < FAISS_AUTO_IVF_MIN:
+        return "hnsw"
+    return "ivf_sq"
+
+
+def _nlist_for(n_vectors):
+    # ~4*sqrt(n) lists, but keep enough training points per list for k-means
+    nlist = int(4 * math.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // 39, 65536))
+
+
+def _pq_m_for(dim, pq_m):
+    # PQ needs the sub-quantizer count to divide the dimension
+    while dim % pq_m:
+        pq_m -= 1
+    return pq_m
+
+
+def make_index(dim, n_vectors, index_type=FAISS_INDEX_TYPE):
+    """Empty (untrained) index for ``n_vectors`` vectors of size ``dim``."""
+    index_type = choose_index_type(n_vectors, index_type)
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, FAISS_HNSW_M)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        return index
+
+    nlist = _nlist_for(n_vectors)
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_sq":
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit
+        )
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_m_for(dim, FAISS_PQ_M), 8)
+    return index
+
+
+def train_index(index, vectors, seed=0):
+    """Train on a random sample large enough for the index's coarse/PQ codebooks."""
+    if index.is_trained:
+        return index
+
+    sample_size = len(vectors)
+    if hasattr(index, "nlist"):
+        sample_size = min(len(vectors), max(index.nlist * FAISS_TRAIN_PER_LIST, 256 * 39))
+
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    index.train(np.ascontiguousarray(sample, dtype="float32"))
+    return index
+
+
+def tune_index(index, nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH):
+    """Apply search-time recall/latency knobs (nprobe for IVF, efSearch for HNSW)."""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(nprobe, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def describe_index(index):
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivf_sq"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def index_memory_bytes(index):
+    """Serialized size of the index, a close proxy for its resident size."""
+    return int(faiss.serialize_index(index).nbytes)
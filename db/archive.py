@@ -0,0 +1,158 @@
+"""Move past appointments out of the hot tables into the archive database.
+
+The hot ``bookings``/``customers`` tables keep only recent and upcoming
+appointments, so dashboard queries and joins stay small no matter how long
+the clinic has been running. Archived rows live in ``ARCHIVE_DB_PATH`` and
+are only read when a caller asks for them (``get_all_bookings(include_archive=True)``).
+
+Usage:
+    python -m db.archive [--horizon-days 90] [--batch-size 500]
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db import database
+from db.database import attach_archive, get_connection
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "0") == "1"
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_S = int(os.getenv("ARCHIVE_INTERVAL_S", "3600"))
+# Pause between batches so chat writes can grab the write lock.
+ARCHIVE_BATCH_PAUSE_S = 0.05
+
+logger = logging.getLogger(__name__)
+
+_archiver_thread = None
+_archiver_lock = threading.Lock()
+
+
+def _archive_batch(conn, cutoff, batch_size):
+    """Move one batch of bookings older than ``cutoff``; returns rows moved."""
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("DELETE FROM temp.archive_batch")
+        cursor.execute("""
+            INSERT INTO temp.archive_batch (id, customer_id)
+            SELECT id, customer_id FROM main.bookings
+            WHERE start_at < ?
+            ORDER BY start_at
+            LIMIT ?
+        """, (cutoff, batch_size))
+        moved = cursor.rowcount
+        if moved <= 0:
+            cursor.execute("ROLLBACK")
+            return 0
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO archive.customers (customer_id, name, email, phone)
+            SELECT customer_id, name, email, phone FROM main.customers
+            WHERE customer_id IN (SELECT customer_id FROM temp.archive_batch)
+        """)
+        cursor.execute("""
+            INSERT OR REPLACE INTO archive.bookings (
+                id, customer_id, booking_type, date, time, status, created_at,
+                start_at, duration_min, archived_at
+            )
+            SELECT
+                id, customer_id, booking_type, date, time, status, created_at,
+                start_at, duration_min, ?
+            FROM main.bookings
+            WHERE id IN (SELECT id FROM temp.archive_batch)
+        """, (datetime.now().isoformat(),))
+        cursor.execute("""
+            DELETE FROM main.bookings
+            WHERE id IN (SELECT id FROM temp.archive_batch)
+        """)
+        # Customers still referenced by a hot booking stay in the hot table too.
+        cursor.execute("""
+            DELETE FROM main.customers
+            WHERE customer_id IN (SELECT customer_id FROM temp.archive_batch)
+              AND NOT EXISTS (
+                  SELECT 1 FROM main.bookings b
+                  WHERE b.customer_id = main.customers.customer_id
+              )
+        """)
+        cursor.execute("COMMIT")
+        return moved
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+
+def archive_old_bookings(horizon_days=ARCHIVE_HORIZON_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive appointments that started more than ``horizon_days`` ago.
+
+    Work is split into ``batch_size`` transactions so the hot database is
+    never locked for long. Returns the number of bookings moved.
+    """
+    cutoff = (datetime.now() - timedelta(days=horizon_days)).strftime("%Y-%m-%dT%H:%M")
+
+    conn = get_connection()
+    conn.isolation_level = None
+    total = 0
+    try:
+        attach_archive(conn)
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY, customer_id INTEGER)"
+        )
+        while True:
+            moved = _archive_batch(conn, cutoff, batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+            time.sleep(ARCHIVE_BATCH_PAUSE_S)
+    finally:
+        conn.close()
+
+    if total:
+        logger.info("Archived %d bookings older than %s", total, cutoff)
+    return total
+
+
+def _archiver_loop(horizon_days, interval_s):
+    while True:
+        try:
+            archive_old_bookings(horizon_days)
+        except Exception:
+            logger.exception("Booking archival failed")
+        time.sleep(interval_s)
+
+
+def start_archiver(horizon_days=ARCHIVE_HORIZON_DAYS, interval_s=ARCHIVE_INTERVAL_S):
+    """Start the background archiver once per process (no-op unless ARCHIVE_ENABLED=1)."""
+    global _archiver_thread
+
+    if not ARCHIVE_ENABLED:
+        return None
+
+    with _archiver_lock:
+        if _archiver_thread is None or not _archiver_thread.is_alive():
+            _archiver_thread = threading.Thread(
+                target=_archiver_loop,
+                args=(horizon_days, interval_s),
+                name="booking-archiver",
+                daemon=True
+            )
+            _archiver_thread.start()
+    return _archiver_thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive past bookings")
+    parser.add_argument("--db", default=database.DB_PATH, help="SQLite database path")
+    parser.add_argument("--archive-db", default=database.ARCHIVE_DB_PATH, help="Archive database path")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    database.DB_PATH = args.db
+    database.ARCHIVE_DB_PATH = args.archive_db
+    moved = archive_old_bookings(args.horizon_days, args.batch_size)
+    print(f"Archived {moved} bookings older than {args.horizon_days} days")
@@ -0,0 +1,262 @@
+"""Bulk booking import and streaming export.
+
+Usage:
+    python -m db.bulk import appointments.csv [--historical] [--report errors.jsonl]
+    python -m db.bulk export bookings.csv [--format jsonl] [--include-archive]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from itertools import islice
+
+from db import database
+from db.database import (
+    BOOKING_COLUMNS_SQL,
+    DEFAULT_DURATION_MIN,
+    attach_archive,
+    get_connection,
+    init_db,
+)
+from utils.validation import BOOKING_FIELDS, normalize_time, to_start_at, validate_batch
+
+BULK_CHUNK_SIZE = 1000
+EXPORT_FETCH_SIZE = 1000
+EXPORT_COLUMNS = ["id", "name", "email", "phone", "date", "time", "status", "created_at"]
+
+
+# ---------- READING ----------
+
+def _detect_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(path, fmt=None):
+    """Yield ``(line_no, row_dict)`` from a CSV or JSONL file without loading it whole."""
+    fmt = fmt or _detect_format(path)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    row = {"__error__": f"invalid JSON: {e.msg}"}
+                if not isinstance(row, dict):
+                    row = {"__error__": "expected a JSON object"}
+                yield line_no, row
+
+
+def _clean(row):
+    if "__error__" in row:
+        return row
+    return {field: str(row.get(field) or "").strip() for field in BOOKING_FIELDS}
+
+
+# ---------- IMPORT ----------
+
+def _insert_chunk(conn, rows, status):
+    """Insert customers and bookings for ``rows`` in one transaction."""
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.executemany(
+            "INSERT INTO customers (name, email, phone) VALUES (?, ?, ?)",
+            [(r["name"], r["email"], r["phone"]) for r in rows]
+        )
+        # AUTOINCREMENT hands out consecutive ids while we hold the write lock,
+        # so the customer ids of this chunk end at last_insert_rowid().
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+        first_id = last_id - len(rows) + 1
+
+        created_at = datetime.now().isoformat()
+        cursor.executemany("""
+            INSERT INTO bookings (
+                customer_id, booking_type, date, time, status, created_at,
+                start_at, duration_min
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                first_id + i, "Doctor Appointment", r["date"], normalize_time(r["time"]),
+                status, created_at, to_start_at(r["date"], r["time"]), DEFAULT_DURATION_MIN
+            )
+            for i, r in enumerate(rows)
+        ])
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+
+def import_bookings(path, fmt=None, historical=False, chunk_size=BULK_CHUNK_SIZE, status="CONFIRMED"):
+    """Stream bookings from ``path`` into the database.
+
+    Rows are validated in batches with the same rules as the chat flow
+    (``historical=True`` accepts past dates) and inserted with
+    ``executemany`` in one transaction per chunk. Returns a report with
+    per-row errors; a failing chunk is rolled back and reported row by row.
+    """
+    init_db()
+    conn = get_connection()
+    conn.isolation_level = None
+
+    report = {"total": 0, "imported": 0, "failed": 0, "errors": []}
+    rows_iter = read_rows(path, fmt)
+
+    try:
+        while True:
+            batch = list(islice(rows_iter, chunk_size))
+            if not batch:
+                break
+            report["total"] += len(batch)
+
+            line_nos = [line_no for line_no, _ in batch]
+            rows = [_clean(row) for _, row in batch]
+            parsed = [i for i, r in enumerate(rows) if "__error__" not in r]
+            errors = validate_batch([rows[i] for i in parsed], historical=historical)
+
+            valid = []
+            for i, row in enumerate(rows):
+                if "__error__" in row:
+                    report["errors"].append({"line": line_nos[i], "errors": [row["__error__"]]})
+            for i, row_errors in zip(parsed, errors):
+                if row_errors:
+                    report["errors"].append({"line": line_nos[i], "errors": row_errors})
+                else:
+                    valid.append(i)
+
+            if valid:
+                try:
+                    _insert_chunk(conn, [rows[i] for i in valid], status)
+                    report["imported"] += len(valid)
+                except Exception as e:
+                    report["errors"].extend(
+                        {"line": line_nos[i], "errors": [f"database error: {e}"]} for i in valid
+                    )
+
+            report["failed"] = report["total"] - report["imported"]
+    finally:
+        conn.close()
+
+    report["errors"].sort(key=lambda e: e["line"])
+    return report
+
+
+# ---------- EXPORT ----------
+
+def iter_bookings(fetch_size=EXPORT_FETCH_SIZE, include_archive=False):
+    """Yield booking rows from a cursor in ``fetch_size`` pages.
+
+    Archived bookings are included (in id order with the rest) when
+    ``include_archive`` is set.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        if include_archive:
+            attach_archive(conn)
+            cursor.execute(f"""
+                SELECT {BOOKING_COLUMNS_SQL}
+                FROM main.bookings b
+                JOIN main.customers c ON b.customer_id = c.customer_id
+                UNION ALL
+                SELECT {BOOKING_COLUMNS_SQL}
+                FROM archive.bookings b
+                JOIN archive.customers c ON b.customer_id = c.customer_id
+                ORDER BY id
+            """)
+        else:
+            cursor.execute(f"""
+                SELECT {BOOKING_COLUMNS_SQL}
+                FROM bookings b
+                JOIN customers c ON b.customer_id = c.customer_id
+                ORDER BY b.id
+            """)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def export_bookings(out, fmt="csv", include_archive=False):
+    """Write bookings to the text file object ``out``; returns the row count.
+
+    Only live bookings are written unless ``include_archive`` is set.
+    """
+    rows = iter_bookings(include_archive=include_archive)
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+            count += 1
+    return count
+
+
+def export_bookings_to_file(path, fmt=None, include_archive=False):
+    fmt = fmt or _detect_format(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        return export_bookings(f, fmt, include_archive=include_archive)
+
+
+# ---------- CLI ----------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk booking import/export")
+    parser.add_argument("--db", default=database.DB_PATH, help="SQLite database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Import bookings from CSV or JSONL")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=["csv", "jsonl"])
+    imp.add_argument("--historical", action="store_true", help="Accept past appointment dates")
+    imp.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    imp.add_argument("--report", help="Write per-row errors to this JSONL file")
+
+    exp = sub.add_parser("export", help="Export bookings to CSV or JSONL")
+    exp.add_argument("path")
+    exp.add_argument("--format", choices=["csv", "jsonl"])
+    exp.add_argument("--include-archive", action="store_true", help="Also export archived bookings")
+
+    args = parser.parse_args(argv)
+    database.DB_PATH = args.db
+
+    if args.command == "import":
+        report = import_bookings(
+            args.path, fmt=args.format, historical=args.historical, chunk_size=args.chunk_size
+        )
+        print(f"Imported {report['imported']}/{report['total']} rows, {report['failed']} failed")
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                for error in report["errors"]:
+                    f.write(json.dumps(error) + "\n")
+        else:
+            for error in report["errors"][:20]:
+                print(f"  line {error['line']}: {'; '.join(error['errors'])}")
+        return 1 if report["failed"] else 0
+
+    count = export_bookings_to_file(args.path, args.format, include_archive=args.include_archive)
+    print(f"Exported {count} bookings to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
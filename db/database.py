@@ -1,9 +1,55 @@
+import os
 import sqlite3
-from datetime import datetime
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, date
+from utils.tracing import traced
+from utils.validation import normalize_time, to_start_at
+
+DB_PATH = os.getenv("BOOKINGS_DB", "bookings.db")
+ARCHIVE_DB_PATH = os.getenv("BOOKINGS_ARCHIVE_DB", "bookings_archive.db")
+DEFAULT_DURATION_MIN = 30
+WRITE_BEHIND = os.getenv("BOOKING_WRITE_BEHIND", "0") == "1"
+# How long save_booking waits for the writer thread before giving up
+WRITE_BEHIND_TIMEOUT_S = float(os.getenv("BOOKING_WRITE_TIMEOUT_S", "30"))
+SCHEMA_VERSION = 1
 
 
 def get_connection():
-    return sqlite3.connect("bookings.db", check_same_thread=False)
+    return sqlite3.connect(DB_PATH, check_same_thread=False)
+
+
+def attach_archive(conn):
+    """Attach the archive database as ``archive`` and make sure its tables exist."""
+    conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive.customers (
+            customer_id INTEGER PRIMARY KEY,
+            name TEXT,
+            email TEXT,
+            phone TEXT
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive.bookings (
+            id INTEGER PRIMARY KEY,
+            customer_id INTEGER,
+            booking_type TEXT,
+            date TEXT,
+            time TEXT,
+            status TEXT,
+            created_at TEXT,
+            start_at TEXT,
+            duration_min INTEGER,
+            archived_at TEXT
+        )
+    """)
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS archive.idx_archive_start_at ON bookings(start_at)"
+    )
+    return conn
 
 
 def init_db():
@@ -28,18 +74,60 @@ def init_db():
             time TEXT,
             status TEXT,
             created_at TEXT,
+            start_at TEXT,
+            duration_min INTEGER DEFAULT 30,
             FOREIGN KEY(customer_id) REFERENCES customers(customer_id)
         )
     """)
 
+    migrate(conn)
+
     conn.commit()
     conn.close()
 
 
-def save_booking(data):
-    conn = get_connection()
+def _backfill_start_at(cursor):
+    rows = cursor.execute(
+        "SELECT id, date, time FROM bookings WHERE start_at IS NULL"
+    ).fetchall()
+
+    updates = []
+    for booking_id, date_text, time_text in rows:
+        try:
+            updates.append((to_start_at(date_text, time_text), normalize_time(time_text), booking_id))
+        except (ValueError, TypeError, AttributeError):
+            # Unparseable legacy rows keep a NULL start_at and stay out of range queries.
+            continue
+
+    cursor.executemany(
+        "UPDATE bookings SET start_at = ?, time = ? WHERE id = ?", updates
+    )
+
+
+def migrate(conn):
+    """Bring an existing database up to ``SCHEMA_VERSION``."""
     cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
 
+    if version < 1:
+        # v1: canonical ISO-8601 start time + duration, indexed for range scans
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(bookings)")}
+        if "start_at" not in columns:
+            cursor.execute("ALTER TABLE bookings ADD COLUMN start_at TEXT")
+        if "duration_min" not in columns:
+            cursor.execute(
+                f"ALTER TABLE bookings ADD COLUMN duration_min INTEGER DEFAULT {DEFAULT_DURATION_MIN}"
+            )
+        _backfill_start_at(cursor)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bookings_start_at ON bookings(start_at, status)"
+        )
+
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def insert_booking(cursor, data):
+    """Insert the customer and booking rows for ``data``; the caller commits."""
     # Insert customer
     cursor.execute("""
         INSERT INTO customers (name, email, phone)
@@ -51,46 +139,147 @@ def save_booking(data):
     # Insert booking
     cursor.execute("""
         INSERT INTO bookings (
-            customer_id, booking_type, date, time, status, created_at
+            customer_id, booking_type, date, time, status, created_at,
+            start_at, duration_min
         )
-        VALUES (?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         customer_id,
         "Doctor Appointment",
         data["date"],
-        data["time"],
+        normalize_time(data["time"]),
         "CONFIRMED",
-        datetime.now().isoformat()
+        datetime.now().isoformat(),
+        data.get("start_at") or to_start_at(data["date"], data["time"]),
+        data.get("duration_min") or DEFAULT_DURATION_MIN
     ))
 
-    booking_id = cursor.lastrowid
+    return cursor.lastrowid
+
+
+class BookingNotSaved(RuntimeError):
+    """The booking was withdrawn before it was written; it is safe to retry."""
+
+
+@traced("save_booking")
+def save_booking(data):
+    if WRITE_BEHIND:
+        # Group-commit mode: the writer thread owns the connection.
+        from db.writer import get_writer
+        future = get_writer().submit(data)
+        try:
+            return future.result(timeout=WRITE_BEHIND_TIMEOUT_S)
+        except FutureTimeoutError:
+            # Only a booking the writer has not started can be withdrawn; once
+            # it is in a transaction, wait for the outcome rather than guess.
+            if future.cancel():
+                raise BookingNotSaved(
+                    f"Booking not saved: writer busy for {WRITE_BEHIND_TIMEOUT_S:g}s"
+                ) from None
+            return future.result()
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    booking_id = insert_booking(cursor, data)
 
     conn.commit()
     conn.close()
 
     return booking_id
 
-def get_all_bookings():
+
+BOOKING_COLUMNS_SQL = """
+    b.id,
+    c.name,
+    c.email,
+    c.phone,
+    b.date,
+    b.time,
+    b.status,
+    b.created_at
+"""
+
+
+@traced("get_all_bookings")
+def get_all_bookings(include_archive=False):
+    """All bookings, newest first; archived bookings only when ``include_archive`` is set."""
     conn = get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT 
-            b.id,
-            c.name,
-            c.email,
-            c.phone,
-            b.date,
-            b.time,
-            b.status,
-            b.created_at
+    if include_archive:
+        attach_archive(conn)
+        cursor.execute(f"""
+            SELECT {BOOKING_COLUMNS_SQL}
+            FROM main.bookings b
+            JOIN main.customers c ON b.customer_id = c.customer_id
+            UNION ALL
+            SELECT {BOOKING_COLUMNS_SQL}
+            FROM archive.bookings b
+            JOIN archive.customers c ON b.customer_id = c.customer_id
+            ORDER BY created_at DESC
+        """)
+    else:
+        cursor.execute(f"""
+            SELECT {BOOKING_COLUMNS_SQL}
+            FROM bookings b
+            JOIN customers c ON b.customer_id = c.customer_id
+            ORDER BY b.created_at DESC
+        """)
+
+    rows = cursor.fetchall()
+    conn.close()
+
+    return rows
+
+
+@traced("get_bookings_between")
+def get_bookings_between(start, end):
+    """Bookings with ``start <= start_at < end`` (ISO-8601 strings or dates)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(f"""
+        SELECT {BOOKING_COLUMNS_SQL}
         FROM bookings b
         JOIN customers c ON b.customer_id = c.customer_id
-        ORDER BY b.created_at DESC
-    """)
+        WHERE b.start_at >= ? AND b.start_at < ?
+        ORDER BY b.start_at
+    """, (str(start), str(end)))
 
     rows = cursor.fetchall()
     conn.close()
 
     return rows
 
+
+@traced("get_upcoming_bookings")
+def get_upcoming_bookings(limit=20):
+    """Next ``limit`` appointments from today onwards, soonest first."""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(f"""
+        SELECT {BOOKING_COLUMNS_SQL}
+        FROM bookings b
+        JOIN customers c ON b.customer_id = c.customer_id
+        WHERE b.start_at >= ?
+        ORDER BY b.start_at
+        LIMIT ?
+    """, (date.today().isoformat(), limit))
+
+    rows = cursor.fetchall()
+    conn.close()
+
+    return rows
+
+
+def count_upcoming_bookings():
+    conn = get_connection()
+    count = conn.execute(
+        "SELECT COUNT(*) FROM bookings WHERE start_at >= ?",
+        (date.today().isoformat(),)
+    ).fetchone()[0]
+    conn.close()
+
+    return count
@@ -0,0 +1,253 @@
+"""Single-writer group commit for booking writes.
+
+With ``BOOKING_WRITE_BEHIND=1`` every ``save_booking`` call is handed to one
+writer thread that owns the SQLite connection. The thread drains its queue
+and commits up to ``WRITER_MAX_BATCH`` bookings per transaction, waiting at
+most ``WRITER_MAX_DELAY_MS`` for a batch to fill, so a burst of bookings
+shares one fsync instead of paying one each.
+
+Failure handling:
+- A booking that fails to insert (bad data, constraint error) is rolled back
+  to its own savepoint; only that caller's future gets the exception and the
+  rest of the batch still commits.
+- If the transaction itself fails (BEGIN/COMMIT, disk or lock errors) nothing
+  in the batch is durable, every future in it gets the exception, and the
+  writer reopens its connection before the next batch.
+- Futures only resolve after COMMIT returns, so a ``booking_id`` is never
+  handed out for a row that could still be rolled back.
+- If the connection cannot be (re)opened the writer closes itself, every
+  queued future gets that exception, and ``get_writer`` starts a new writer
+  on the next call.
+- ``close()`` commits everything submitted before it; later ``submit`` calls
+  raise ``RuntimeError``.
+
+Benchmark against the direct path:
+    python -m db.writer --bookings 2000 --threads 16
+"""
+
+import argparse
+import atexit
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from db import database
+from db.database import insert_booking
+
+WRITER_MAX_BATCH = int(os.getenv("WRITER_MAX_BATCH", "64"))
+WRITER_MAX_DELAY_MS = float(os.getenv("WRITER_MAX_DELAY_MS", "5"))
+
+_STOP = object()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class BookingWriter:
+    def __init__(self, db_path=None, max_batch=WRITER_MAX_BATCH, max_delay_ms=WRITER_MAX_DELAY_MS):
+        self.db_path = db_path or database.DB_PATH
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.commits = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="booking-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data):
+        """Queue a booking; the returned future resolves to its ``booking_id`` once durable."""
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("BookingWriter is closed")
+            self._queue.put((future, data))
+        return future
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self, timeout=None):
+        """Commit everything already submitted, then stop the writer thread."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ---------- WRITER THREAD ----------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.isolation_level = None
+        return conn
+
+    def _next_batch(self):
+        """Block for one item, then gather more until the batch is full or the delay expires."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit_batch(self, conn, batch):
+        cursor = conn.cursor()
+        outcomes = []
+
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for future, data in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT booking")
+                try:
+                    outcomes.append((future, insert_booking(cursor, data), None))
+                    cursor.execute("RELEASE booking")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO booking")
+                    cursor.execute("RELEASE booking")
+                    outcomes.append((future, None, e))
+            cursor.execute("COMMIT")
+            self.commits += 1
+        except Exception as e:
+            try:
+                cursor.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            for future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return False
+
+        for future, booking_id, error in outcomes:
+            if error is None:
+                future.set_result(booking_id)
+            else:
+                future.set_exception(error)
+        return True
+
+    def _fail(self, error):
+        """Stop accepting work and fail everything still queued with ``error``."""
+        with self._close_lock:
+            self._closed = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                future, _ = item
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+
+    def _run(self):
+        conn = None
+        try:
+            conn = self._connect()
+            while True:
+                batch, stop = self._next_batch()
+                if batch and not self._commit_batch(conn, batch):
+                    conn.close()
+                    conn = None
+                    conn = self._connect()
+                if stop:
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def get_writer():
+    """Process-wide writer, created on first use and closed at exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.closed:
+            _writer = BookingWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+# ---------- BENCHMARK ----------
+
+def _sample_booking(i):
+    return {
+        "name": f"Patient {i}",
+        "email": f"patient{i}@example.com",
+        "phone": "9876543210",
+        "date": "2030-01-15",
+        "time": "10:30 AM",
+    }
+
+
+def _bench_direct(n, threads):
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda i: database.save_booking(_sample_booking(i)), range(n)))
+        return time.perf_counter() - start, n
+
+
+def _bench_group_commit(n, threads, max_batch, max_delay_ms):
+    writer = BookingWriter(max_batch=max_batch, max_delay_ms=max_delay_ms)
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda i: writer.submit(_sample_booking(i)).result(), range(n)))
+        elapsed = time.perf_counter() - start
+    writer.close()
+    return elapsed, writer.commits
+
+
+def run_benchmark(n, threads, max_batch=WRITER_MAX_BATCH, max_delay_ms=WRITER_MAX_DELAY_MS):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("direct", "group_commit"):
+            database.DB_PATH = os.path.join(tmp, f"{mode}.db")
+            database.init_db()
+            if mode == "direct":
+                elapsed, commits = _bench_direct(n, threads)
+            else:
+                elapsed, commits = _bench_group_commit(n, threads, max_batch, max_delay_ms)
+            results[mode] = {
+                "seconds": round(elapsed, 3),
+                "bookings_per_s": round(n / elapsed, 1),
+                "commits": commits,
+                "commits_per_s": round(commits / elapsed, 1),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark direct vs group-commit booking writes")
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=WRITER_MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=WRITER_MAX_DELAY_MS)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.bookings, args.threads, args.max_batch, args.max_delay_ms)
+    for mode, r in results.items():
+        print(
+            f"{mode:>13}: {r['bookings_per_s']:>8} bookings/s  "
+            f"{r['commits']:>6} commits ({r['commits_per_s']} commits/s)  {r['seconds']} s"
+        )
@@ -0,0 +1,315 @@
+"""Embedding backends for the knowledge base.
+
+``EMBEDDING_BACKEND`` selects the implementation:
+
+- ``hf`` (default): sentence-transformers all-MiniLM-L6-v2 on PyTorch.
+- ``onnx``: the same model exported to ONNX and int8 dynamically quantized,
+  run with ONNX Runtime. No torch at serving time, smaller resident
+  footprint, configurable thread count.
+
+Both implement LangChain's ``Embeddings`` interface so FAISS can use either.
+Backends pickle as configuration only (never weights) and load their model
+on first use, so saved vector stores stay small and unpickling one costs
+nothing before it is reattached to the process-wide backend.
+
+Usage:
+    python -m models.embeddings export     # one-off, needs torch + transformers
+    python -m models.embeddings parity     # cosine agreement ONNX vs HF
+    python -m models.embeddings bench      # ingest + single-query throughput
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hf")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "data/models/all-MiniLM-L6-v2-int8")
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 = let ONNX Runtime decide
+ONNX_MAX_BATCH_TOKENS = int(os.getenv("ONNX_MAX_BATCH_TOKENS", "8192"))
+ONNX_MAX_BATCH_SIZE = int(os.getenv("ONNX_MAX_BATCH_SIZE", "64"))
+EMBEDDING_MAX_LENGTH = 256  # all-MiniLM-L6-v2 max_seq_length
+EMBEDDING_PARITY_MIN_COSINE = float(os.getenv("EMBEDDING_PARITY_MIN_COSINE", "0.99"))
+
+
+class HuggingFaceBackend(Embeddings):
+    """Full-precision sentence-transformers model (the original backend)."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME):
+        self.model_name = model_name
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            self._client = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self._client
+
+    def embed_documents(self, texts):
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.client.embed_query(text)
+
+    def memory_bytes(self):
+        """Parameter bytes of the loaded model (0 until first use)."""
+        if self._client is None:
+            return 0
+        model = self._client.client
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+
+    def __getstate__(self):
+        return {"model_name": self.model_name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+class OnnxInt8Backend(Embeddings):
+    """int8-quantized ONNX export of all-MiniLM-L6-v2 on ONNX Runtime.
+
+    ``embed_documents`` sorts inputs by token length and packs batches up to
+    ``max_batch_tokens`` padded tokens, so short chunks are not padded to the
+    longest one in the upload. The session and tokenizer are loaded on first
+    use, so unpickling a vector store does not load a second model.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, threads=ONNX_THREADS,
+                 max_batch_tokens=ONNX_MAX_BATCH_TOKENS, max_batch_size=ONNX_MAX_BATCH_SIZE):
+        self.model_dir = model_dir
+        self.threads = threads
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self._session = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self._session is not None:
+                return
+            if not ONNX_AVAILABLE:
+                raise ImportError("onnxruntime and tokenizers are required for the ONNX embedding backend")
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+                options.inter_op_num_threads = 1
+
+            tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+            tokenizer.enable_truncation(EMBEDDING_MAX_LENGTH)
+            tokenizer.no_padding()
+
+            session = ort.InferenceSession(
+                os.path.join(self.model_dir, "model.int8.onnx"),
+                sess_options=options,
+                providers=["CPUExecutionProvider"]
+            )
+            self.input_names = {i.name for i in session.get_inputs()}
+            self._tokenizer = tokenizer
+            self._session = session
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._load()
+        return self._session
+
+    @property
+    def tokenizer(self):
+        if self._session is None:
+            self._load()
+        return self._tokenizer
+
+    def _run(self, encodings):
+        max_len = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), max_len), dtype="int64")
+        attention_mask = np.zeros((len(encodings), max_len), dtype="int64")
+        for row, e in enumerate(encodings):
+            input_ids[row, :len(e.ids)] = e.ids
+            attention_mask[row, :len(e.ids)] = 1
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalize (as sentence-transformers does)
+        mask = attention_mask[:, :, None].astype("float32")
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def _batches(self, encodings):
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i].ids))
+        batch = []
+        for i in order:
+            longest = len(encodings[i].ids)
+            if batch and (
+                len(batch) >= self.max_batch_size
+                or (len(batch) + 1) * longest > self.max_batch_tokens
+            ):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch(list(texts))
+        vectors = [None] * len(texts)
+        for batch in self._batches(encodings):
+            for i, vector in zip(batch, self._run([encodings[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self._run([self.tokenizer.encode(text)])[0].tolist()
+
+    def memory_bytes(self):
+        """Size of the int8 weights file, which the session holds in memory (0 until first use)."""
+        if self._session is None:
+            return 0
+        return os.path.getsize(os.path.join(self.model_dir, "model.int8.onnx"))
+
+    def __getstate__(self):
+        return {
+            "model_dir": self.model_dir,
+            "threads": self.threads,
+            "max_batch_tokens": self.max_batch_tokens,
+            "max_batch_size": self.max_batch_size,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def get_embedding_backend(name=EMBEDDING_BACKEND):
+    if name == "hf":
+        return HuggingFaceBackend()
+    if name == "onnx":
+        return OnnxInt8Backend()
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+# ---------- EXPORT / PARITY / BENCHMARK ----------
+
+def export_onnx_int8(out_dir=ONNX_MODEL_DIR, model_name=EMBEDDING_MODEL_NAME):
+    """Export the model to ONNX and quantize its weights to int8 (needs torch + transformers)."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    fp32_path = os.path.join(out_dir, "model.fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "seq"},
+                "attention_mask": {0: "batch", 1: "seq"},
+                "token_type_ids": {0: "batch", 1: "seq"},
+                "last_hidden_state": {0: "batch", 1: "seq"},
+            },
+            opset_version=14,
+        )
+
+    quantize_dynamic(fp32_path, os.path.join(out_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+    return out_dir
+
+
+PARITY_SENTENCES = [
+    "Please bring your insurance card and a photo ID to every appointment.",
+    "Do not eat or drink anything except water for 8 to 12 hours before a fasting blood test.",
+    "The clinic is open Monday to Friday from 9:00 AM to 5:00 PM.",
+    "What time does the clinic open?",
+    "Can I reschedule my appointment?",
+    "Dr. Rao sees pediatric patients on weekdays.",
+    "Lab results are shared through the patient portal within two working days.",
+    "fasting",
+]
+
+
+def parity(reference, candidate, texts=PARITY_SENTENCES):
+    """Per-text cosine similarity between two backends' embeddings."""
+    a = np.asarray(reference.embed_documents(texts), dtype="float32")
+    b = np.asarray(candidate.embed_documents(texts), dtype="float32")
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def throughput(backend, texts, queries=200):
+    start = time.perf_counter()
+    backend.embed_documents(texts)
+    ingest_s = time.perf_counter() - start
+
+    latencies = []
+    for i in range(queries):
+        t0 = time.perf_counter()
+        backend.embed_query(texts[i % len(texts)])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+    return {
+        "ingest_texts_per_s": round(len(texts) / ingest_s, 1),
+        "query_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embedding backend tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="Export and int8-quantize the ONNX model")
+    exp.add_argument("--out", default=ONNX_MODEL_DIR)
+    par = sub.add_parser("parity", help="Compare ONNX embeddings against the HF backend")
+    par.add_argument("--min-cosine", type=float, default=EMBEDDING_PARITY_MIN_COSINE)
+    bench = sub.add_parser("bench", help="Ingest and single-query throughput per backend")
+    bench.add_argument("--texts", type=int, default=2000)
+    bench.add_argument("--backends", default="hf,onnx")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(f"Exported to {export_onnx_int8(args.out)}")
+        return 0
+
+    if args.command == "parity":
+        cosines = parity(HuggingFaceBackend(), OnnxInt8Backend())
+        print(f"cosine min={cosines.min():.4f} mean={cosines.mean():.4f} (threshold {args.min_cosine})")
+        return 0 if cosines.min() >= args.min_cosine else 1
+
+    texts = [PARITY_SENTENCES[i % len(PARITY_SENTENCES)] + f" ({i})" for i in range(args.texts)]
+    for name in args.backends.split(","):
+        result = throughput(get_embedding_backend(name), texts)
+        print(f"{name:>5}: " + "  ".join(f"{k}={v}" for k, v in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
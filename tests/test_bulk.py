@@ -0,0 +1,23 @@
+import json
+
+from db import bulk, database
+
+
+def test_import_reports_non_object_jsonl_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "bookings.db"))
+    booking = {
+        "name": "Jane Doe",
+        "email": "jane@example.com",
+        "phone": "9876543210",
+        "date": "2031-01-15",
+        "time": "10:30 AM",
+    }
+    path = tmp_path / "bookings.jsonl"
+    path.write_text("\n".join([json.dumps(booking), "[1, 2]", "5", json.dumps(booking)]) + "\n")
+
+    report = bulk.import_bookings(str(path), chunk_size=2)
+
+    assert report["imported"] == 2
+    assert report["failed"] == 2
+    assert [e["line"] for e in report["errors"]] == [2, 3]
+    assert all("expected a JSON object" in e["errors"][0] for e in report["errors"])
@@ -0,0 +1,21 @@
+from app.dedup import strip_boilerplate
+
+
+def _pages(title, n):
+    return [
+        f"{title} Patient Handbook\nSection {i}: body text that is unique to page {i}\n{title} Clinic Confidential"
+        for i in range(n)
+    ]
+
+
+def test_headers_stripped_per_document_of_different_sizes():
+    short_doc = _pages("Sunrise", 4)
+    long_doc = _pages("Lakeside", 10)
+
+    pages, removed = strip_boilerplate([short_doc, long_doc])
+
+    assert len(pages) == 14
+    assert removed == 2 * 14
+    assert not any("Handbook" in p or "Confidential" in p for p in pages)
+    assert all("Section" in p for p in pages)
+
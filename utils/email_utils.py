@@ -5,7 +5,10 @@ try:
 except ImportError:
     BREVO_AVAILABLE = False
 
+from utils.tracing import traced
 
+
+@traced("send_confirmation_email")
 def send_confirmation_email(to_email, booking_id, booking_data):
     if not BREVO_AVAILABLE:
         raise Exception("Brevo email service not available in this environment")
@@ -0,0 +1,250 @@
+"""Per-component memory accounting and budgets.
+
+Modules that hold long-lived memory register a component with a function
+that returns its size in bytes, plus an optional ``shed(target_bytes)``
+hook that frees memory. ``report`` lists every component next to its
+budget; ``check_budgets`` logs the components over budget and sheds them.
+Set ``MEMORY_TRACEMALLOC=1`` to also record Python allocations with
+tracemalloc. ``top_allocations`` and ``growth_since_baseline`` then show
+where memory goes and what keeps growing.
+
+Budgets are given in MB as ``MEMORY_BUDGETS="sessions=256,vector_stores=1024"``.
+``MEMORY_RSS_BUDGET_MB`` caps the whole process. When it is exceeded,
+components that can shed are halved one at a time until RSS is back under.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from types import FunctionType, ModuleType
+
+import numpy as np
+
+MEMORY_TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", "1"))
+MEMORY_RSS_BUDGET_MB = int(os.getenv("MEMORY_RSS_BUDGET_MB", "0"))  # 0 = no process budget
+MEMORY_CHECK_INTERVAL_S = float(os.getenv("MEMORY_CHECK_INTERVAL_S", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_budgets(spec):
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, mb = item.split("=", 1)
+            budgets[name.strip()] = int(float(mb) * 2**20)
+    return budgets
+
+
+MEMORY_BUDGETS = _parse_budgets(os.getenv("MEMORY_BUDGETS", ""))
+
+_lock = threading.Lock()
+_components = {}
+_baseline = None
+_last_check = 0.0
+_rss_shed_futile = False
+
+if MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+    tracemalloc.start(MEMORY_TRACEMALLOC_FRAMES)
+
+
+# ---------- SIZING ----------
+
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None), range)
+_OPAQUE = (type, ModuleType, FunctionType)
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes reachable from ``obj`` (containers, attributes, numpy buffers).
+
+    Shared objects are counted once; classes, modules and functions are not counted.
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _OPAQUE):
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, np.ndarray):
+            total += sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+            continue
+        total += sys.getsizeof(obj)
+        if isinstance(obj, _ATOMIC):
+            continue
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+
+        if hasattr(obj, "__dict__"):
+            stack.append(vars(obj))
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                stack.append(getattr(obj, slot))
+    return total
+
+
+def process_rss_bytes():
+    """Current resident set size, or peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ---------- REGISTRY ----------
+
+def register(name, measure, shed=None):
+    """Track a component: ``measure()`` returns bytes, ``shed(target_bytes)`` frees memory."""
+    with _lock:
+        _components[name] = (measure, shed)
+
+
+def unregister(name):
+    with _lock:
+        _components.pop(name, None)
+
+
+def report():
+    """One row per component, largest first, with its budget and shed support."""
+    with _lock:
+        components = dict(_components)
+
+    rows = []
+    for name, (measure, shed) in components.items():
+        try:
+            nbytes = int(measure())
+        except Exception:
+            logger.exception("Memory measurement failed for %s", name)
+            nbytes = 0
+        budget = MEMORY_BUDGETS.get(name)
+        rows.append({
+            "component": name,
+            "mb": round(nbytes / 2**20, 2),
+            "budget_mb": round(budget / 2**20, 2) if budget else None,
+            "over_budget": bool(budget and nbytes > budget),
+            "can_shed": shed is not None,
+        })
+    rows.sort(key=lambda r: r["mb"], reverse=True)
+    return rows
+
+
+def _rss_over_budget():
+    return bool(MEMORY_RSS_BUDGET_MB) and process_rss_bytes() > MEMORY_RSS_BUDGET_MB * 2**20
+
+
+def _shed(name, shed, target_bytes):
+    try:
+        shed(target_bytes)
+        return True
+    except Exception:
+        logger.exception("Shedding memory component %s failed", name)
+        return False
+
+
+def check_budgets(force=False):
+    """Log and shed components over budget; returns the names that were shed.
+
+    Components over their own budget are shed down to it. If the process is
+    still over ``MEMORY_RSS_BUDGET_MB``, shed-capable components are halved
+    one at a time, largest first, re-checking RSS after each step. Much of
+    RSS is model weights and allocator slack that shedding cannot free: if a
+    round does not lower RSS, later checks only log until RSS is back under
+    budget, rather than evicting everything one halving at a time.
+
+    Calls within ``MEMORY_CHECK_INTERVAL_S`` of the last one return ``[]``
+    unless ``force`` is set, so this is cheap to call on every chat turn.
+    """
+    global _last_check, _rss_shed_futile
+    with _lock:
+        now = time.monotonic()
+        if not force and now - _last_check < MEMORY_CHECK_INTERVAL_S:
+            return []
+        _last_check = now
+        components = dict(_components)
+
+    shed_names = []
+    for row in report():
+        if not row["over_budget"]:
+            continue
+        name = row["component"]
+        logger.warning("Memory component %s uses %.1f MB, budget %.1f MB",
+                       name, row["mb"], row["budget_mb"])
+        shed = components.get(name, (None, None))[1]
+        if shed is not None and _shed(name, shed, MEMORY_BUDGETS[name]):
+            shed_names.append(name)
+
+    if not _rss_over_budget():
+        _rss_shed_futile = False
+        return shed_names
+    rss_before = process_rss_bytes()
+    logger.warning("Process RSS %.0f MB is over its %d MB budget",
+                   rss_before / 2**20, MEMORY_RSS_BUDGET_MB)
+    if _rss_shed_futile:
+        return shed_names
+
+    for row in report():
+        name = row["component"]
+        shed = components.get(name, (None, None))[1]
+        if shed is None or row["mb"] == 0:
+            continue
+        if _shed(name, shed, int(row["mb"] * 2**20) // 2) and name not in shed_names:
+            shed_names.append(name)
+        if not _rss_over_budget():
+            break
+    else:
+        _rss_shed_futile = process_rss_bytes() > rss_before * 0.99
+        if _rss_shed_futile:
+            logger.warning("Shedding did not lower RSS; not shedding for RSS until it recovers")
+    return shed_names
+
+
+# ---------- TRACEMALLOC ----------
+
+def take_baseline():
+    """Remember the current allocations for ``growth_since_baseline``."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        return False
+    _baseline = tracemalloc.take_snapshot()
+    return True
+
+
+def _stat_rows(stats, limit, group_by):
+    return [
+        {
+            "location": stat.traceback[0].filename if group_by == "filename" else str(stat.traceback),
+            "kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+            "kb_diff": round(getattr(stat, "size_diff", 0) / 1024, 1),
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def top_allocations(limit=15, group_by="filename"):
+    if not tracemalloc.is_tracing():
+        return []
+    return _stat_rows(tracemalloc.take_snapshot().statistics(group_by), limit, group_by)
+
+
+def growth_since_baseline(limit=15, group_by="filename"):
+    """Allocation sites that grew most since ``take_baseline``."""
+    if not tracemalloc.is_tracing() or _baseline is None:
+        return []
+    diff = tracemalloc.take_snapshot().compare_to(_baseline, group_by)
+    return _stat_rows([d for d in diff if d.size_diff > 0], limit, group_by)
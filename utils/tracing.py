@@ -0,0 +1,197 @@
+"""Lightweight span tracing for the chat hot path.
+
+Spans are context managers that time one stage (RAG lookup, LLM call,
+SQLite, Brevo, ...) and feed a per-stage ring buffer of durations. A
+``turn`` groups the spans of one chat turn so the slowest turns can be
+inspected stage by stage. Set ``TRACE_ENABLED=1`` to switch it on; when
+disabled ``span`` returns a shared no-op object and ``traced`` returns the
+wrapped function unchanged.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+TRACE_RING_SIZE = int(os.getenv("TRACE_RING_SIZE", "2048"))
+TRACE_TURN_HISTORY = int(os.getenv("TRACE_TURN_HISTORY", "200"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "data/traces/spans.jsonl")
+TRACE_EXPORT_BATCH = int(os.getenv("TRACE_EXPORT_BATCH", "256"))
+
+_lock = threading.Lock()
+_stages = {}
+_turns = deque(maxlen=TRACE_TURN_HISTORY)
+_export_buffer = []
+_current_turn = ContextVar("current_turn", default=None)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.name, (time.perf_counter() - self.start) * 1000, exc_type is not None)
+        return False
+
+
+class _Turn:
+    __slots__ = ("label", "start", "stages", "token")
+
+    def __init__(self, label):
+        self.label = label
+        self.start = 0.0
+        self.stages = {}
+        self.token = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.token = _current_turn.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        total_ms = (time.perf_counter() - self.start) * 1000
+        _current_turn.reset(self.token)
+        _record("turn", total_ms, exc_type is not None)
+        with _lock:
+            _turns.append({
+                "label": self.label,
+                "at": time.time(),
+                "total_ms": round(total_ms, 2),
+                "stages": {k: round(v, 2) for k, v in self.stages.items()},
+            })
+        return False
+
+
+def _record(name, duration_ms, failed):
+    turn = _current_turn.get()
+    if turn is not None and name != "turn":
+        turn.stages[name] = turn.stages.get(name, 0.0) + duration_ms
+
+    with _lock:
+        ring = _stages.get(name)
+        if ring is None:
+            ring = _stages[name] = deque(maxlen=TRACE_RING_SIZE)
+        ring.append(duration_ms)
+
+        _export_buffer.append((name, time.time(), duration_ms, failed))
+        if len(_export_buffer) >= TRACE_EXPORT_BATCH:
+            _flush_locked()
+
+
+def _flush_locked():
+    if not _export_buffer:
+        return
+    try:
+        os.makedirs(os.path.dirname(TRACE_EXPORT_PATH) or ".", exist_ok=True)
+        with open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+            for name, at, duration_ms, failed in _export_buffer:
+                f.write(json.dumps({
+                    "stage": name,
+                    "at": round(at, 3),
+                    "ms": round(duration_ms, 3),
+                    "error": failed,
+                }) + "\n")
+    except OSError:
+        # Tracing must never break a chat turn; drop the batch instead.
+        pass
+    _export_buffer.clear()
+
+
+# ---------- PUBLIC API ----------
+
+def span(name):
+    """Time one stage: ``with span("rag.similarity_search"): ...``"""
+    if not TRACE_ENABLED:
+        return _NOOP
+    return _Span(name)
+
+
+def turn(label=""):
+    """Group every span opened inside the block into one chat turn."""
+    if not TRACE_ENABLED:
+        return _NOOP
+    return _Turn(label)
+
+
+def traced(name):
+    """Decorator form of ``span``; a no-op when tracing is disabled."""
+    def decorator(func):
+        if not TRACE_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def flush():
+    """Write any buffered span records to ``TRACE_EXPORT_PATH``."""
+    with _lock:
+        _flush_locked()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def stage_stats():
+    """Return p50/p95/p99 per stage over the ring buffer, slowest p95 first."""
+    with _lock:
+        snapshot = {name: list(ring) for name, ring in _stages.items()}
+
+    stats = []
+    for name, values in snapshot.items():
+        values.sort()
+        stats.append({
+            "stage": name,
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 50), 2),
+            "p95_ms": round(_percentile(values, 95), 2),
+            "p99_ms": round(_percentile(values, 99), 2),
+            "max_ms": round(values[-1], 2) if values else 0.0,
+        })
+    stats.sort(key=lambda s: s["p95_ms"], reverse=True)
+    return stats
+
+
+def slowest_turns(limit=10):
+    """Return the slowest recent turns with their per-stage breakdown."""
+    with _lock:
+        turns = list(_turns)
+    turns.sort(key=lambda t: t["total_ms"], reverse=True)
+    return turns[:limit]
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _turns.clear()
+        _export_buffer.clear()
@@ -0,0 +1,83 @@
+import re
+from datetime import datetime, date
+
+EMAIL_PATTERN = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+TIME_PATTERN = re.compile(r"^(0?[1-9]|1[0-2]):[0-5][0-9]\s?(AM|PM|am|pm)$")
+
+
+# ---------- FIELD VALIDATIONS ----------
+
+def is_valid_email(email: str) -> bool:
+    return EMAIL_PATTERN.match(email) is not None
+
+
+def is_valid_phone(phone: str) -> bool:
+    return phone.isdigit() and len(phone) == 10
+
+
+def is_valid_date(date_text: str, historical: bool = False) -> bool:
+    """YYYY-MM-DD; must be today or later unless ``historical`` is set."""
+    try:
+        entered_date = datetime.strptime(date_text, "%Y-%m-%d").date()
+    except ValueError:
+        return False
+    return historical or entered_date >= date.today()
+
+
+def is_valid_future_date(date_text: str) -> bool:
+    return is_valid_date(date_text)
+
+
+def is_valid_time(time_text: str) -> bool:
+    return TIME_PATTERN.match(time_text) is not None
+
+
+# ---------- NORMALIZATION ----------
+
+def normalize_time(time_text: str) -> str:
+    """Canonical clinic time, e.g. "9:05am" -> "09:05 AM"."""
+    text = time_text.strip()
+    if not is_valid_time(text):
+        raise ValueError(f"invalid time: {time_text!r}")
+    hour, minute = text[:-2].strip().split(":")
+    return f"{int(hour):02d}:{minute} {text[-2:].upper()}"
+
+
+def to_start_at(date_text: str, time_text: str) -> str:
+    """ISO-8601 local start time ("2026-01-22T10:30") used for indexed range queries."""
+    parsed = datetime.strptime(
+        f"{date_text.strip()} {normalize_time(time_text)}", "%Y-%m-%d %I:%M %p"
+    )
+    return parsed.strftime("%Y-%m-%dT%H:%M")
+
+
+# ---------- BATCH VALIDATION ----------
+
+BOOKING_FIELDS = ("name", "email", "phone", "date", "time")
+
+
+def validate_batch(rows, historical=False):
+    """Validate a batch of booking dicts column by column.
+
+    Returns one list of error messages per row (empty when the row is valid).
+    """
+    errors = [[] for _ in rows]
+
+    for field in BOOKING_FIELDS:
+        for i, row in enumerate(rows):
+            if not row.get(field):
+                errors[i].append(f"missing {field}")
+
+    checks = (
+        ("email", is_valid_email, "invalid email"),
+        ("phone", is_valid_phone, "invalid phone (10 digits)"),
+        ("date", lambda v: is_valid_date(v, historical), "invalid date" if historical else "date must be today or later (YYYY-MM-DD)"),
+        ("time", is_valid_time, "invalid time (HH:MM AM/PM)"),
+    )
+    for field, check, message in checks:
+        column = [row.get(field) or "" for row in rows]
+        for i, ok in enumerate(map(check, column)):
+            if column[i] and not ok:
+                errors[i].append(message)
+
+    return errors